@@ -0,0 +1,283 @@
+""" Throughput benchmark of the Intcode engine over the bundled programs
+
+Runs the programs from input/ headlessly with scripted inputs, without the curses and asyncio
+controllers of the dayN.py scripts:
+
+    python benchmark.py                          # interpreter
+    python benchmark.py --jit                    # JIT tier
+    python benchmark.py --aot                    # ahead-of-time translated programs
+    python benchmark.py --save baseline.json     # store results as baseline
+    python benchmark.py --compare baseline.json  # show speedup against a baseline
+    python benchmark.py memory:100000 --size 10000000   # synthetic workload of intcode_workload
+"""
+import argparse
+import itertools
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from intcode import IntcodeComputer, Status
+from intcode_aot import AotIntcodeComputer
+from intcode_jit import JitIntcodeComputer
+from intcode_workload import generate
+from utils import read_intlist
+
+Factory = Callable[[List[int]], IntcodeComputer]
+
+
+def day5(make: Factory) -> Any:
+    results = []
+    for system_id in (1, 5):
+        computer = make(read_intlist('day5.txt'))
+        computer.send(system_id)
+        computer.run()
+        results.append(computer.take_outputs()[-1])
+    return results
+
+
+def day7(make: Factory) -> Any:
+    """ feedback loop of part 2, amplifiers take turns until the last one halts """
+    program = read_intlist('day7.txt')
+    max_thrust = -1
+    for phases in itertools.permutations([5, 6, 7, 8, 9]):
+        amplifiers = [make(program) for _ in phases]
+        for amplifier, phase in zip(amplifiers, phases):
+            amplifier.send(phase)
+
+        signal = [0]
+        status = None
+        while status is not Status.HALTED:
+            for amplifier in amplifiers:
+                amplifier.send(*signal)
+                status = amplifier.run()
+                signal = amplifier.take_outputs()
+        max_thrust = max(max_thrust, signal[-1])
+    return max_thrust
+
+
+def day9(make: Factory) -> Any:
+    results = []
+    for mode in (1, 2):
+        computer = make(read_intlist('day9.txt'))
+        computer.send(mode)
+        computer.run()
+        results.extend(computer.take_outputs())
+    return results
+
+
+def day11(make: Factory) -> Any:
+    computer = make(read_intlist('day11.txt'))
+    grid = {}
+    x, y, direction = 0, 0, 0
+    moves = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+    while True:
+        computer.send(grid.get((x, y), 0))
+        status = computer.run()
+        if status is Status.HALTED:
+            break
+        color, turn = computer.take_outputs()
+        grid[x, y] = color
+        direction = (direction + (1 if turn else -1)) % 4
+        x, y = x + moves[direction][0], y + moves[direction][1]
+    return len(grid)
+
+
+def day13(make: Factory) -> Any:
+    """ plays breakout, the paddle follows the ball """
+    program = read_intlist('day13.txt')
+    program[0] = 2
+    computer = make(program)
+    ball = paddle = score = 0
+    while True:
+        status = computer.run()
+        outputs = computer.take_outputs()
+        for i in range(0, len(outputs), 3):
+            x, y, value = outputs[i:i + 3]
+            if x == -1 and y == 0:
+                score = value
+            elif value == 4:
+                ball = x
+            elif value == 3:
+                paddle = x
+        if status is Status.HALTED:
+            return score
+        computer.send((ball > paddle) - (ball < paddle))
+
+
+def day17(make: Factory) -> Any:
+    camera = make(read_intlist('day17.txt'))
+    camera.run()
+    frame = ''.join(map(chr, camera.take_outputs()))
+
+    program = read_intlist('day17.txt')
+    program[0] = 2
+    robot = make(program)
+    routine = 'C,A,C,A,B,A,B,C,B,B\nL,6,L,12,R,12,L,4\nL,12,R,12,L,6\nR,12,L,10,L,10\nn\n'
+    robot.send(*map(ord, routine))
+    robot.run()
+    return [len(frame), robot.take_outputs()[-1]]
+
+
+def day19(make: Factory) -> Any:
+    computer = make(read_intlist('day19.txt'))
+    affected = 0
+    for x in range(50):
+        for y in range(50):
+            computer.reset()
+            computer.send(x, y)
+            computer.run()
+            affected += computer.take_outputs()[0]
+    return affected
+
+
+def day23(make: Factory) -> Any:
+    """ network of part 1: round robin over the NICs until a packet goes to address 255 """
+    program = read_intlist('day23.txt')
+    nics = [make(program) for _ in range(50)]
+    for address, nic in enumerate(nics):
+        nic.send(address)
+
+    while True:
+        for nic in nics:
+            if not nic._state.inputs:
+                nic.send(-1)
+            nic.run()
+            outputs = nic.take_outputs()
+            for i in range(0, len(outputs), 3):
+                address, x, y = outputs[i:i + 3]
+                if address == 255:
+                    return y
+                nics[address].send(x, y)
+
+
+WORKLOADS = {
+    'day5': (day5, [15097178, 1558663]),
+    'day7': (day7, 4931744),
+    'day9': (day9, [3340912345, 51754]),
+    'day11': (day11, 2469),
+    'day13': (day13, 14538),
+    'day17': (day17, [2479, 1119775]),
+    'day19': (day19, 231),
+    'day23': (day23, 17949),
+}
+
+
+def lookup(name: str, size: int = 0) -> Tuple[Callable[[Factory], Any], Any, Sequence[int]]:
+    """ workload function, expected result and program of a bundled or synthetic workload """
+    if ':' not in name:
+        workload, expected = WORKLOADS[name]
+        return workload, expected, read_intlist(f'{name}.txt')
+
+    synthetic = generate(name, size)
+
+    def workload(make: Factory) -> Any:
+        computer = make(synthetic.program)
+        computer.send(*synthetic.inputs)
+        computer.run()
+        return computer.take_outputs()
+
+    return workload, list(synthetic.expected), synthetic.program
+
+
+def count_instructions(workload: Callable[[Factory], Any], computer_class: type) -> int:
+    profiles = []
+
+    def make(program):
+        computer = computer_class(program)
+        profiles.append(computer.enable_profiling())
+        return computer
+
+    workload(make)
+    return sum(sum(profile.executed.values()) for profile in profiles)
+
+
+def measure_copy_cost(program: List[int], computer_class: type, repeat: int = 1000) -> Dict[str, float]:
+    """ microseconds per reset() and per fork() of a machine that has run the program """
+    computer = computer_class(program)
+    computer.run()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        computer.reset()
+    reset = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        computer.fork()
+    fork = time.perf_counter() - start
+
+    return {'reset_us': reset / repeat * 1e6, 'fork_us': fork / repeat * 1e6}
+
+
+def benchmark(name: str, computer_class: type, repeat: int, size: int = 0) -> Dict[str, Any]:
+    workload, expected, program = lookup(name, size)
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = workload(computer_class)
+        seconds.append(time.perf_counter() - start)
+
+    if expected is not None and result != expected:
+        raise AssertionError(f'{name}: expected {expected}, got {result}')
+
+    tracemalloc.start()
+    workload(computer_class)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    instructions = count_instructions(workload, computer_class)
+    best = min(seconds)
+    return {
+        'result': result,
+        'instructions': instructions,
+        'seconds': best,
+        'instructions_per_second': instructions / best,
+        'peak_memory': peak_memory,
+        **measure_copy_cost(program, computer_class),
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]):
+    print(f'{"workload":<10}{"baseline s":>12}{"now s":>10}{"speedup":>10}')
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['seconds']
+        print(f'{name:<10}{before:>12.3f}{result["seconds"]:>10.3f}{before / result["seconds"]:>9.2f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Intcode engine')
+    parser.add_argument('workloads', nargs='*', default=list(WORKLOADS),
+                        help='workloads to run, bundled ones or synthetic like arithmetic:100000')
+    parser.add_argument('--size', type=int, default=0, help='program image size of synthetic workloads')
+    parser.add_argument('--jit', action='store_true', help='use JitIntcodeComputer')
+    parser.add_argument('--aot', action='store_true', help='use AotIntcodeComputer')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per workload, best one counts')
+    parser.add_argument('--save', metavar='FILE', help='write the results as JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare with a saved baseline')
+    args = parser.parse_args()
+
+    computer_class = AotIntcodeComputer if args.aot else JitIntcodeComputer if args.jit else IntcodeComputer
+    results = {}
+    for name in args.workloads:
+        results[name] = benchmark(name, computer_class, args.repeat, args.size)
+        result = results[name]
+        print(f'{name:<6} {result["instructions"]:>10} instr {result["seconds"]:>8.3f}s '
+              f'{result["instructions_per_second"]:>12,.0f} instr/s '
+              f'peak {result["peak_memory"] / 1024:>8.0f} KiB '
+              f'reset {result["reset_us"]:>6.1f}us fork {result["fork_us"]:>6.1f}us')
+
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ from dataclasses import dataclass, field, replace
 from typing import List
 
 from intcode import IntcodeComputer
+from intcode_channel import Channel
 from utils import read_intlist
 
 WHITE = 1
@@ -39,8 +40,8 @@ class Point:
 
 class PaintingRobot:
     def __init__(self, program: List[int], starting_color: int):
-        self.input = asyncio.Queue()
-        self.output = asyncio.Queue()
+        self.input = Channel()
+        self.output = Channel()
         self.computer = IntcodeComputer(program, self.input, self.output)
         self.position = Point(0, 0)
         self.direction = MOVE_UP
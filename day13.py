@@ -3,10 +3,12 @@ import curses
 from dataclasses import dataclass, replace
 from typing import List
 
-from intcode import IntcodeComputer
+from intcode_jit import JitIntcodeComputer
+from intcode_replay import record
 from utils import read_intlist
 
 DISPLAY = True
+RECORDING = None  # file to record the I/O of the game to, replay with intcode_replay.py
 
 TILE_EMPTY = 0
 TILE_WALL = 1
@@ -27,8 +29,9 @@ class GameComputer:
     def __init__(self, program: List[int], window):
         self.window = window
         self.output = asyncio.Queue(maxsize=1)
-        self.computer = IntcodeComputer(
+        self.computer = JitIntcodeComputer(
             program, self.input_handler, self.output)
+        self.recording = record(self.computer) if RECORDING else None
 
         self.score = 0
         self.grid = dict()
@@ -63,6 +66,8 @@ class GameComputer:
 
     async def run_computer(self):
         await self.computer.execute()
+        if self.recording:
+            self.recording.save(RECORDING)
         await self.output.put(99)
         await self.output.put(99)
         await self.output.put(99)
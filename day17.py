@@ -1,9 +1,8 @@
-import asyncio
-import curses
 from typing import List, Set
 
 from intcode import IntcodeComputer
-from utils import Point
+from intcode_ascii import AsciiAdapter
+from utils import Point, read_intlist
 
 
 class Grid:
@@ -43,21 +42,12 @@ class Grid:
         self.grid[key] = list(value)
 
 
-async def part1():
-    input = asyncio.Queue()
-    output = asyncio.Queue()
-    computer = IntcodeComputer('day17.txt', input, output)
-    await computer.execute()
+def part1():
+    camera = AsciiAdapter(IntcodeComputer('day17.txt'))
 
     grid = Grid()
-    line = ''
-    while not output.empty():
-        out = await output.get()
-        if out != 10:
-            line += chr(out)
-        elif line != '':
-            grid.append(line)
-            line = ''
+    for line in camera.read_frame():
+        grid.append(line)
 
     alignments = grid.find_alignment()
 
@@ -65,7 +55,8 @@ async def part1():
         print(line)
     print(f'Part 1: {sum(alignments)}')
 
-async def inout_handler(input_queue, output_queue):
+
+def part2():
     input_text = [
         'C,A,C,A,B,A,B,C,B,B',
         'L,6,L,12,R,12,L,4',
@@ -74,47 +65,20 @@ async def inout_handler(input_queue, output_queue):
         'n'
     ]
 
-    input_iterator = iter(input_text)
-
-    while True:
-        output = await output_queue.get()
-        try:
-            print(chr(output), end='')
-        except ValueError:
-            print(f'Part 2: {output}')
-            return
-
-        while not output_queue.empty():
-            output = await output_queue.get()
-            try:
-                print(chr(output), end='')
-            except ValueError:
-                print(f'Part 2: {output}')
-                return
-
-        print('> ', end='')
-        line = next(input_iterator)
-        for i in map(ord, list(line)):
-            print(chr(i), end='')
-            await input_queue.put(i)
-
-        print('')
-        await input_queue.put(10)
-
-
-async def part2():
-    input = asyncio.Queue()
-    output = asyncio.Queue()
-    computer = IntcodeComputer('day17.txt', input, output)
-    computer._state._memory[0] = 2
-
-    tasks = [
-        asyncio.create_task(inout_handler(input, output)),
-        asyncio.create_task(computer.execute())
-    ]
-    await asyncio.gather(*tasks)
+    program = read_intlist('day17.txt')
+    program[0] = 2
+    robot = AsciiAdapter(IntcodeComputer(program))
+
+    for line in input_text:
+        print(robot.read_until_prompt(), end='')
+        print(f'> {line}')
+        robot.send_line(line)
+
+    print(robot.read_until_prompt(), end='')
+    print(f'Part 2: {robot.values[-1]}')
 
     print('Part 2 complete')
 
-# asyncio.run(part1())
-asyncio.run(part2())
+
+# part1()
+part2()
@@ -1,4 +1,3 @@
-import asyncio
 from typing import List
 
 from intcode import IntcodeComputer
@@ -6,20 +5,17 @@ from utils import Point
 
 
 
-async def part1(grid_size: int):
-    input = asyncio.Queue()
-    output = asyncio.Queue()
-    computer = IntcodeComputer('day19.txt', input, output)
+def part1(grid_size: int):
+    computer = IntcodeComputer('day19.txt')
 
     grid = [['?' for x in range(grid_size)] for y in range(grid_size)]
     affected_points = 0
     for x in range(grid_size):
         for y in range(grid_size):
             computer.reset()
-            input.put_nowait(x)
-            input.put_nowait(y)
-            await computer.execute()
-            result = output.get_nowait()
+            computer.send(x, y)
+            computer.run()
+            result = computer.take_outputs()[0]
 
             if result == 1:
                 affected_points += 1
@@ -34,4 +30,4 @@ async def part1(grid_size: int):
     
 
 
-asyncio.run(part1(50))
\ No newline at end of file
+part1(50)
\ No newline at end of file
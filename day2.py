@@ -1,5 +1,6 @@
 from typing import List
 
+from intcode_symbolic import find_inputs
 from utils import read_intlist
 
 
@@ -53,12 +54,13 @@ def part2(input_file: str):
 
     expected_output = 19690720
 
-    for noun in range(99):
-        for verb in range(99):
-            output = execute_program(program, noun, verb)
-            if output == expected_output:
-                print('Part 2: {}'.format(100*noun+verb))
-                return
+    # memory[0] is linear in noun and verb, solved instead of trying every pair
+    inputs = find_inputs(program, {1: 'noun', 2: 'verb'}, expected_output,
+                         {'noun': range(99), 'verb': range(99)})
+    if inputs is None:
+        print('Part 2: no noun and verb give {}'.format(expected_output))
+    else:
+        print('Part 2: {}'.format(100*inputs['noun']+inputs['verb']))
 
 
 part1('day2.txt')
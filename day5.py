@@ -3,6 +3,7 @@ import logging
 from typing import List
 
 from intcode import IntcodeComputer
+from intcode_channel import Channel
 from utils import read_intlist
 
 
@@ -24,8 +25,8 @@ def test2():
 
 async def execute_program(input: List[int]) -> List[int]:
     program = read_intlist('day5.txt')
-    input_queue = asyncio.Queue()
-    output_queue = asyncio.Queue()
+    input_queue = Channel()
+    output_queue = Channel()
     computer = IntcodeComputer(program, input_queue, output_queue)
 
     for i in input:
@@ -1,78 +1,64 @@
-import asyncio
 import itertools
-import logging
-import string
-from asyncio import Queue
 from typing import List
 
-from intcode import IntcodeComputer
-from utils import read_intlist
+from intcode import Cluster, IntcodeComputer
+from intcode_image import load_image
 
-async def amplifier_worker(name: str, program: List[int], input: Queue, output: Queue):
-    amplifier = IntcodeComputer(program, input, output)
-    logging.debug('%s created', name)
-    await amplifier.execute()
-    logging.debug('%s finished', name)
-
-
-async def try_amplifier(program: List[int], phases: List[int]):
-    tasks = []
-    first_queue = Queue()
-
-    input_queue = first_queue
+def try_amplifier(program: List[int], phases: List[int]) -> int:
+    amplifiers = [IntcodeComputer(program) for _ in phases]
+    cluster = Cluster(amplifiers)
     for i, phase in enumerate(phases):
-        input_queue.put_nowait(phase)
+        cluster.send(i, phase)
+        if i < len(phases) - 1:
+            cluster.connect(i, i + 1)
 
-        if (i == (len(phases) - 1)):
-            output_queue = first_queue
-        else:
-            output_queue = Queue()
+    # the last amplifier feeds back into the first one, its last output is the thrust
+    thrust = []
 
-        name = string.ascii_uppercase[i]
-        task = asyncio.create_task(amplifier_worker(
-            name, program, input_queue, output_queue))
-        tasks.append(task)
+    def feedback(index: int, outputs: List[int]):
+        thrust[:] = outputs
+        cluster.send(0, *outputs)
 
-        input_queue = output_queue
+    cluster.on_output = feedback
 
     # Initialize first amplifier
-    first_queue.put_nowait(0)
+    cluster.send(0, 0)
 
-    await asyncio.gather(*tasks)
-    return first_queue.get_nowait()
+    cluster.run()
+    return thrust[-1]
 
 
-async def test1():
+def test1():
     program = [3, 15, 3, 16, 1002, 16, 10, 16, 1, 16, 15, 15, 4, 15, 99, 0, 0]
     phase_sequences = itertools.permutations([0, 1, 2, 3, 4])
 
     max_thrust = -1
     for phases in phase_sequences:
-        thrust = await try_amplifier(program, phases)
+        thrust = try_amplifier(program, phases)
         max_thrust = max(thrust, max_thrust)
     print(f'Test1: {max_thrust}')
 
 
-async def part1():
-    program = read_intlist('day7.txt')
+def part1():
+    program = load_image('day7.txt')
     phase_sequences = itertools.permutations([0, 1, 2, 3, 4])
 
     max_thrust = -1
     for phases in phase_sequences:
-        thrust = await try_amplifier(program, phases)
+        thrust = try_amplifier(program, phases)
         max_thrust = max(thrust, max_thrust)
     print(f'Part 1: {max_thrust}')
 
 
-async def part2():
-    program = read_intlist('day7.txt')
+def part2():
+    program = load_image('day7.txt')
     phase_sequences = itertools.permutations([5, 6, 7, 8, 9])
 
     max_thrust = -1
     for phases in phase_sequences:
-        thrust = await try_amplifier(program, phases)
+        thrust = try_amplifier(program, phases)
         max_thrust = max(thrust, max_thrust)
     print(f'Part 2: {max_thrust}')
 
-asyncio.run(part1())
-asyncio.run(part2())
+part1()
+part2()
@@ -1,14 +1,14 @@
 import asyncio
-from asyncio import Queue
 from typing import List
 
 from intcode import IntcodeComputer
-from utils import read_intlist
+from intcode_channel import Channel
+from intcode_image import load_image
 
 
 async def run_program(program: List[int], input_signal: int):
-    input = Queue()
-    output = Queue()
+    input = Channel()
+    output = Channel()
     computer = IntcodeComputer(program, input, output)
 
     input.put_nowait(input_signal)
@@ -20,13 +20,13 @@ async def run_program(program: List[int], input_signal: int):
 
 
 async def part1():
-    program = read_intlist('day9.txt')
+    program = load_image('day9.txt')
     print('Part 1:')
     await run_program(program, 1)
 
 
 async def part2():
-    program = read_intlist('day9.txt')
+    program = load_image('day9.txt')
     print('Part 2:')
     await run_program(program, 2)
 
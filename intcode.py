@@ -1,33 +1,230 @@
+import copy
+import hashlib
+import json
 import logging
-from asyncio import Queue
-from typing import Coroutine, List, Union
+import time
+from array import array
+from asyncio import Queue, sleep
+from collections import Counter, deque
+from enum import Enum
+from typing import (Any, Awaitable, Callable, Coroutine, Deque, Dict, List,
+                    Optional, Sequence, Set, Type, Union)
 
-from utils import read_intlist
+from intcode_channel import Channel
+from intcode_image import image_cells, load_image
 
 LOG = logging.getLogger(__name__)
 
-def reverse(string: str) -> str:
-    string = "".join(reversed(string))
-    return string
+PAGE_BITS = 10
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+# instructions execute() runs before it lets other tasks of the event loop have a turn
+EXECUTE_SLICE = 10000
+
+
+def program_hash(program: List[int]) -> str:
+    """ stable identity of a program image, for caches outliving the process """
+    return hashlib.sha256(','.join(map(str, program)).encode()).hexdigest()
+
+
+class Status(Enum):
+    """ Reason why the synchronous core stopped running """
+    HALTED = 'halted'
+    NEEDS_INPUT = 'needs input'
+    OUTPUT = 'output'
+    YIELDED = 'yielded'  # max_instructions executed, the program can continue
+    BREAK = 'break'  # stopped by a breakpoint or watchpoint of intcode_debug
 
 
 class Opcode:
+    """ A decoded instruction: opcode, parameter modes and the instruction handling it """
+
     def __init__(self, instruction: int):
         self.opcode = instruction % 100
-        self._parameter_mode = reverse(str(instruction // 100)) + '0000'
+        self.parameter_modes = (
+            instruction // 100 % 10,
+            instruction // 1000 % 10,
+            instruction // 10000 % 10)
+        self.instruction = INSTRUCTION_MAP[self.opcode]
 
     def parameter_mode(self, parameter: int) -> int:
-        """ mode 0 = position mode, mode 1 = immediate mode """
-        return int(self._parameter_mode[parameter])
+        """ mode 0 = position mode, mode 1 = immediate mode, mode 2 = relative mode """
+        return self.parameter_modes[parameter]
+
+
+class Memory:
+    """ Dense memory for the program image, zero pages above it are only allocated when written
+
+    Copies share their storage, the dense area and pages are copied on the first write.
+    An immutable program image (a tuple, see intcode_image) is shared the same way.
+    """
+
+    def __init__(self, program: Sequence[int]):
+        self._dense_shared = isinstance(program, tuple)
+        self._dense = program if self._dense_shared else list(program)
+        self._size = len(self._dense)
+        self._pages: Dict[int, List[int]] = {}
+        self._shared_pages: Set[int] = set()
+
+    def __getitem__(self, address: int) -> int:
+        return self.read(address)
+
+    def __setitem__(self, address: int, value: int):
+        self.write(address, value)
+
+    def read(self, address: int) -> int:
+        if (0 <= address < self._size):
+            return self._dense[address]
+        if (address < 0):
+            raise IndexError(f'Negative memory address {address}')
+
+        page = self._pages.get(address >> PAGE_BITS)
+        if page is None:
+            return 0
+        return page[address & PAGE_MASK]
+
+    def write(self, address: int, value: int):
+        if (0 <= address < self._size):
+            if self._dense_shared:
+                self._dense = list(self._dense)
+                self._dense_shared = False
+            self._dense[address] = value
+            return
+        if (address < 0):
+            raise IndexError(f'Negative memory address {address}')
+
+        page = self._pages.get(address >> PAGE_BITS)
+        if page is None:
+            page = [0] * PAGE_SIZE
+            self._pages[address >> PAGE_BITS] = page
+        elif (address >> PAGE_BITS) in self._shared_pages:
+            self._shared_pages.discard(address >> PAGE_BITS)
+            page = list(page)
+            self._pages[address >> PAGE_BITS] = page
+        page[address & PAGE_MASK] = value
+
+    def copy(self) -> 'Memory':
+        """ copy-on-write copy, costs nothing until either side writes """
+        # attributes in __init__ order, copy.copy() would leave a clone without the
+        # compact attribute layout and every lookup in the interpreter loop slower
+        clone = self.__class__.__new__(self.__class__)
+        clone._dense_shared = self._dense_shared = True
+        clone._dense = self._dense
+        clone._size = self._size
+        clone._pages = dict(self._pages)
+        clone._shared_pages = set(self._pages)
+        self._shared_pages = set(self._pages)
+        return clone
+
+    @classmethod
+    def over_buffers(cls, dense: Sequence[int], pages: Dict[int, Sequence[int]]) -> 'Memory':
+        """ memory reading shared cells (like memoryviews of a mapped file) until written """
+        memory = cls(())
+        memory._dense = dense
+        memory._size = len(dense)
+        memory._dense_shared = True
+        memory._pages = dict(pages)
+        memory._shared_pages = set(pages)
+        return memory
+
+    def allocated(self) -> int:
+        """ number of memory cells actually backed by storage """
+        return self._size + len(self._pages) * PAGE_SIZE
+
+
+def _private_cells(cells: Sequence[int]) -> Union[array, List[int]]:
+    """ writable copy of shared cells, int64 unless they are already promoted to bigints """
+    if isinstance(cells, array):
+        return cells[:]
+    if isinstance(cells, memoryview):
+        copy = array('q')
+        copy.frombytes(cells.cast('B'))
+        return copy
+    return list(cells)
+
+
+class CompactMemory(Memory):
+    """ Memory storing cells as int64 in array('q'), a quarter of the size of a list of ints
+
+    Copies duplicate a plain buffer. A value beyond int64 promotes just the dense area or the
+    page it is written to back to a list of Python ints, so bigint programs keep working.
+    """
+
+    def __init__(self, program: Sequence[int]):
+        super().__init__(program)
+        # images from load_image come with shared int64 cells
+        cells = image_cells(self._dense) if self._dense_shared else None
+        if cells is not None:
+            self._dense = cells
+        else:
+            try:
+                self._dense = array('q', self._dense)
+                self._dense_shared = False
+            except OverflowError:
+                pass
+
+    def write(self, address: int, value: int):
+        if (0 <= address < self._size):
+            if self._dense_shared:
+                self._dense = _private_cells(self._dense)
+                self._dense_shared = False
+            try:
+                self._dense[address] = value
+            except OverflowError:
+                LOG.debug('Value %d promotes the dense memory to bigints', value)
+                self._dense = list(self._dense)
+                self._dense[address] = value
+            return
+        if (address < 0):
+            raise IndexError(f'Negative memory address {address}')
+
+        number = address >> PAGE_BITS
+        page = self._pages.get(number)
+        if page is None:
+            page = array('q', bytes(PAGE_SIZE * 8))
+            self._pages[number] = page
+        elif number in self._shared_pages:
+            self._shared_pages.discard(number)
+            page = _private_cells(page)
+            self._pages[number] = page
+        try:
+            page[address & PAGE_MASK] = value
+        except OverflowError:
+            LOG.debug('Value %d promotes page %d to bigints', value, number)
+            page = list(page)
+            self._pages[number] = page
+            page[address & PAGE_MASK] = value
 
 
 class State:
-    def __init__(self, program: List[int], input_queue: Union[Queue, Coroutine], output_queue: Union[Queue, Coroutine]):
-        self._memory = program.copy()
-        self._input = input_queue
-        self._output = output_queue
+    def __init__(self, program: Sequence[int], memory_class: Type[Memory] = Memory):
+        self._memory = memory_class(program)
+        self.inputs: Deque[int] = deque()
+        self.outputs: List[int] = []
         self._instruction_pointer = 0
         self._relative_base = 0
+        self._decoded: Dict[int, Opcode] = {}
+
+    def copy(self) -> 'State':
+        """ independent copy of the state, memory is shared copy-on-write """
+        clone = self.__class__.__new__(self.__class__)
+        clone._memory = self._memory.copy()
+        clone.inputs = deque(self.inputs)
+        clone.outputs = list(self.outputs)
+        clone._instruction_pointer = self._instruction_pointer
+        clone._relative_base = self._relative_base
+        clone._decoded = dict(self._decoded)
+        return clone
+
+    def replace_memory(self, memory: Memory):
+        """ continues on other memory, like a restored checkpoint, forgetting what was decoded
+        from cells it changes """
+        self._decoded = {
+            address: opcode for address, opcode in self._decoded.items()
+            if memory.read(address) == self._memory.read(address)
+        }
+        self._memory = memory
 
     def set_instruction_pointer(self, instruction_pointer: int):
         self._instruction_pointer = instruction_pointer
@@ -36,21 +233,12 @@ class State:
         self._relative_base += offset
 
     def opcode(self) -> Opcode:
-        if (self._instruction_pointer < 0):
-            return None
-        return Opcode(self._read(self._instruction_pointer))
-
-    async def read_input(self) -> int:
-        if (isinstance(self._input, Queue)):
-            return await self._input.get()
-        else:
-            return await self._input()
-
-    async def write_output(self, value: int):
-        if (isinstance(self._output, Queue)):
-            await self._output.put(value)
-        else:
-            await self._output(value)
+        """ decodes the instruction at the instruction pointer, caching it by address """
+        opcode = self._decoded.get(self._instruction_pointer)
+        if opcode is None:
+            opcode = Opcode(self._read(self._instruction_pointer))
+            self._decoded[self._instruction_pointer] = opcode
+        return opcode
 
     def read_parameter(self, index: int) -> int:
         """ first parameter has index 0 """
@@ -83,17 +271,13 @@ class State:
                 f'Unsupported parameter_mode {parameter_mode} for writing')
 
     def _read(self, address: int) -> int:
-        self._ensure_enough_memory(address)
-        return self._memory[address]
+        return self._memory.read(address)
 
     def _write(self, address: int, value: int):
-        self._ensure_enough_memory(address)
-        self._memory[address] = value
-
-    def _ensure_enough_memory(self, address: int):
-        needed = address - len(self._memory) + 1
-        if (needed > 0):
-            self._memory = self._memory + [0] * needed
+        self._memory.write(address, value)
+        if address in self._decoded:
+            # self-modifying code: decode this instruction again when it is reached
+            del self._decoded[address]
 
 
 class Instruction:
@@ -103,7 +287,8 @@ class Instruction:
     def next_instruction(self, instruction_pointer: int) -> int:
         return instruction_pointer + self.size()
 
-    async def execute(self, state: State):
+    def execute(self, state: State) -> Optional[Status]:
+        """ executes the instruction, returns a Status when the core has to stop """
         next_ip = self.next_instruction(state._instruction_pointer)
         state.set_instruction_pointer(next_ip)
 
@@ -111,107 +296,113 @@ class Instruction:
 class AddInstruction(Instruction):
     def size(self) -> int: return 4
 
-    async def execute(self, state):
+    def execute(self, state):
         a = state.read_parameter(0)
         b = state.read_parameter(1)
         result = a + b
 
         state.write_parameter(2, result)
-        await super().execute(state)
+        super().execute(state)
 
 
 class MultiplyInstruction(Instruction):
     def size(self) -> int: return 4
 
-    async def execute(self, state):
+    def execute(self, state):
         a = state.read_parameter(0)
         b = state.read_parameter(1)
         result = a * b
 
         state.write_parameter(2, result)
-        await super().execute(state)
+        super().execute(state)
 
 
 class InputInstruction(Instruction):
     def size(self) -> int: return 2
 
-    async def execute(self, state):
-        value = await state.read_input()
+    def execute(self, state):
+        if not state.inputs:
+            return Status.NEEDS_INPUT
+
+        value = state.inputs.popleft()
         LOG.debug('Input %d', value)
         state.write_parameter(0, value)
-        await super().execute(state)
+        super().execute(state)
 
 
 class OutputInstruction(Instruction):
     def size(self) -> int: return 2
 
-    async def execute(self, state):
+    def execute(self, state):
         output = state.read_parameter(0)
-        await state.write_output(output)
+        state.outputs.append(output)
         LOG.debug('Output %d', output)
-        await super().execute(state)
+        super().execute(state)
+        return Status.OUTPUT
 
 
 class JumpIfTrueInstruction(Instruction):
     def size(self) -> int: return 3
 
-    async def execute(self, state):
+    def execute(self, state):
         value = state.read_parameter(0)
         address = state.read_parameter(1)
 
         if (value != 0):
             state.set_instruction_pointer(address)
         else:
-            await super().execute(state)
+            super().execute(state)
 
 
 class JumpIfFalseInstruction(Instruction):
     def size(self) -> int: return 3
 
-    async def execute(self, state):
+    def execute(self, state):
         value = state.read_parameter(0)
         address = state.read_parameter(1)
 
         if (value == 0):
             state.set_instruction_pointer(address)
         else:
-            await super().execute(state)
+            super().execute(state)
 
 
 class LessThanInstruction(Instruction):
     def size(self) -> int: return 4
 
-    async def execute(self, state):
+    def execute(self, state):
         a = state.read_parameter(0)
         b = state.read_parameter(1)
         result = 1 if (a < b) else 0
         state.write_parameter(2, result)
-        await super().execute(state)
+        super().execute(state)
 
 
 class EqualsInstruction(Instruction):
     def size(self) -> int: return 4
 
-    async def execute(self, state):
+    def execute(self, state):
         a = state.read_parameter(0)
         b = state.read_parameter(1)
         result = 1 if (a == b) else 0
         state.write_parameter(2, result)
-        await super().execute(state)
+        super().execute(state)
 
 
 class AdjustRelativeBaseInstruction(Instruction):
     def size(self) -> int: return 2
 
-    async def execute(self, state):
+    def execute(self, state):
         a = state.read_parameter(0)
         state.update_relative_base(a)
-        await super().execute(state)
+        super().execute(state)
 
 
 class HaltInstruction(Instruction):
-    # TODO: betere manier verzinnen om programma te beeindigen
-    def size(self) -> int: return -9000
+    def size(self) -> int: return 1
+
+    def execute(self, state):
+        return Status.HALTED
 
 
 INSTRUCTION_MAP = {
@@ -228,24 +419,328 @@ INSTRUCTION_MAP = {
 }
 
 
+class Profile:
+    """ Counters collected by IntcodeComputer.enable_profiling() """
+
+    MODE_NAMES = {0: 'position', 1: 'immediate', 2: 'relative'}
+
+    def __init__(self):
+        self.executed: Counter = Counter()  # (address, Opcode) -> times executed
+        self.input_stalls = 0
+        self.run_time = 0.0
+        self.input_waits = 0
+        self.input_time = 0.0
+        self.output_waits = 0
+        self.output_time = 0.0
+
+    def as_dict(self, hot_addresses: int = 20) -> Dict[str, Any]:
+        opcodes = Counter()
+        modes = Counter()
+        addresses = Counter()
+        for (address, opcode), count in self.executed.items():
+            opcodes[type(opcode.instruction).__name__] += count
+            addresses[address] += count
+            for parameter in range(opcode.instruction.size() - 1):
+                modes[Profile.MODE_NAMES.get(opcode.parameter_mode(parameter), 'unknown')] += count
+
+        return {
+            'instructions': sum(opcodes.values()),
+            'run_time': self.run_time,
+            'opcodes': dict(opcodes.most_common()),
+            'parameter_modes': dict(modes.most_common()),
+            'hot_addresses': addresses.most_common(hot_addresses),
+            'io': {
+                'input_stalls': self.input_stalls,
+                'input_waits': self.input_waits,
+                'input_time': self.input_time,
+                'output_waits': self.output_waits,
+                'output_time': self.output_time,
+            },
+        }
+
+    def to_json(self, hot_addresses: int = 20) -> str:
+        return json.dumps(self.as_dict(hot_addresses), indent=2)
+
+
+class ExecutionStats:
+    """ How a machine spent its time in IntcodeComputer.execute() """
+
+    def __init__(self):
+        self.slices = 0  # calls of run()
+        self.yields = 0  # slices that used up the time slice
+        self.running_time = 0.0
+        self.ready_time = 0.0  # yielded, waiting for the event loop to resume it
+        self.blocked_time = 0.0  # waiting for input or for room for its outputs
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
 class IntcodeComputer:
-    def __init__(self, program: Union[List[int], str], input_queue: Queue, output_queue: Queue):
+    state_class = State
+    time_slice: Optional[int] = EXECUTE_SLICE  # per machine, None runs without yielding
+
+    def __init__(self, program: Union[Sequence[int], str], input_queue: Union[Queue, Channel, Coroutine] = None, output_queue: Union[Queue, Channel, Coroutine] = None,
+                 memory_class: Type[Memory] = Memory):
         if isinstance(program, str):
-            self._program = read_intlist(program)
+            self._program = load_image(program)
         else:
             self._program = program
 
-        self._input_queue = input_queue
-        self._output_queue = output_queue
+        self._connect(input_queue, output_queue)
+        self._initial_state = self.state_class(self._program, memory_class)
 
         self.reset()
 
     def reset(self):
-        self._state = State(self._program, self._input_queue, self._output_queue)
-
-    async def execute(self):
-        current_opcode = self._state.opcode()
-        while current_opcode is not None:
-            instruction = INSTRUCTION_MAP[current_opcode.opcode]
-            await instruction.execute(self._state)
-            current_opcode = self._state.opcode()
+        self._state = self._initial_state.copy()
+
+    def snapshot(self) -> State:
+        """ captures the current state, memory is shared copy-on-write """
+        return self._state.copy()
+
+    def restore(self, snapshot: State):
+        """ continues from a snapshot, the snapshot itself can be restored again later """
+        self._state = snapshot.copy()
+
+    def fork(self, input_queue: Union[Queue, Channel, Coroutine] = None, output_queue: Union[Queue, Channel, Coroutine] = None) -> 'IntcodeComputer':
+        """ independent machine continuing from the current state, with its own I/O """
+        clone = copy.copy(self)
+        clone._connect(input_queue, output_queue)
+        clone._state = self._state.copy()
+        clone.disable_profiling()
+        return clone
+
+    def enable_profiling(self) -> Profile:
+        """ swaps in the counting interpreter and timed I/O, the normal path stays untouched """
+        self.profile = Profile()
+        self.run = self._profiled_run
+        self._read_inputs = self._profiled_read_inputs
+        self._write_outputs = self._profiled_write_outputs
+        return self.profile
+
+    def disable_profiling(self):
+        for name in ('run', '_read_inputs', '_write_outputs'):
+            self.__dict__.pop(name, None)
+
+    def send(self, *values: int):
+        """ queues values for the input instructions of the synchronous core """
+        self._state.inputs.extend(values)
+
+    def take_outputs(self) -> List[int]:
+        """ returns (and clears) all outputs produced since the last call """
+        outputs = self._state.outputs
+        self._state.outputs = []
+        return outputs
+
+    def run(self, output_limit: Optional[int] = None, max_instructions: Optional[int] = None) -> Status:
+        """ runs until the program halts, needs input, has produced output_limit outputs
+        or has executed max_instructions instructions """
+        if max_instructions is not None:
+            return self._run_slice(output_limit, max_instructions)
+
+        state = self._state
+        target = None if output_limit is None else len(state.outputs) + output_limit
+        while True:
+            status = state.opcode().instruction.execute(state)
+            if status is not None:
+                if status is not Status.OUTPUT:
+                    return status
+                if target is not None and len(state.outputs) >= target:
+                    return status
+
+    def _run_slice(self, output_limit: Optional[int], max_instructions: int) -> Status:
+        """ run() with an instruction budget, kept out of the unbounded loop """
+        state = self._state
+        target = None if output_limit is None else len(state.outputs) + output_limit
+        for _ in range(max_instructions):
+            status = state.opcode().instruction.execute(state)
+            if status is not None:
+                if status is not Status.OUTPUT:
+                    return status
+                if target is not None and len(state.outputs) >= target:
+                    return status
+        return Status.YIELDED
+
+    def run_until_input(self) -> Status:
+        return self.run()
+
+    def run_until_output(self, count: int = 1) -> Status:
+        return self.run(count)
+
+    async def execute(self) -> Status:
+        """ runs the program, exchanging input and output through the queues or coroutines
+
+        After time_slice instructions without I/O the machine yields, so one busy machine
+        does not starve the other tasks. Where the time went is counted in self.stats.
+        Returns Status.HALTED, or Status.BREAK when a breakpoint or watchpoint of a debugger
+        (see intcode_debug) stopped the machine, awaiting execute() again continues the run.
+        """
+        self.stats = stats = ExecutionStats()
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            status = self.run(self._output_batch, self.time_slice)
+            running = clock()
+            stats.slices += 1
+            stats.running_time += running - start
+
+            outputs = self.take_outputs()
+            if outputs:
+                await self._write_outputs(outputs)
+            if status is Status.YIELDED:
+                stats.yields += 1
+                ready = clock()
+                stats.blocked_time += ready - running
+                await sleep(0)
+                stats.ready_time += clock() - ready
+                continue
+
+            if status is Status.NEEDS_INPUT:
+                self.send(*await self._read_inputs())
+            stats.blocked_time += clock() - running
+            if status is Status.HALTED or status is Status.BREAK:
+                return status
+
+    def _connect(self, input_queue: Union[Queue, Channel, Coroutine], output_queue: Union[Queue, Channel, Coroutine]):
+        """ resolves how execute() exchanges values once, instead of checking on every value """
+        self._input_queue = input_queue
+        self._output_queue = output_queue
+        self._receive = _receiver(input_queue)
+        self._deliver = _deliverer(output_queue)
+        if isinstance(output_queue, Channel):
+            # a bounded channel takes that many outputs before the producer waits
+            self._output_batch = output_queue.maxsize or None
+        else:
+            self._output_batch = 1
+
+    async def _read_inputs(self) -> List[int]:
+        return await self._receive()
+
+    async def _write_outputs(self, values: List[int]):
+        await self._deliver(values)
+
+    def _profiled_run(self, output_limit: Optional[int] = None, max_instructions: Optional[int] = None) -> Status:
+        """ interpreter loop of run(), counting every executed instruction """
+        profile = self.profile
+        executed = profile.executed
+        state = self._state
+        target = None if output_limit is None else len(state.outputs) + output_limit
+        budget = float('inf') if max_instructions is None else max_instructions
+        start = time.perf_counter()
+        try:
+            while budget > 0:
+                budget -= 1
+                ip = state._instruction_pointer
+                opcode = state.opcode()
+                status = opcode.instruction.execute(state)
+                if status is Status.NEEDS_INPUT:
+                    profile.input_stalls += 1
+                    return status
+
+                executed[ip, opcode] += 1
+                if status is not None:
+                    if status is not Status.OUTPUT:
+                        return status
+                    if target is not None and len(state.outputs) >= target:
+                        return status
+            return Status.YIELDED
+        finally:
+            profile.run_time += time.perf_counter() - start
+
+    async def _profiled_read_inputs(self) -> List[int]:
+        start = time.perf_counter()
+        try:
+            return await IntcodeComputer._read_inputs(self)
+        finally:
+            self.profile.input_waits += 1
+            self.profile.input_time += time.perf_counter() - start
+
+    async def _profiled_write_outputs(self, values: List[int]):
+        start = time.perf_counter()
+        try:
+            await IntcodeComputer._write_outputs(self, values)
+        finally:
+            self.profile.output_waits += 1
+            self.profile.output_time += time.perf_counter() - start
+
+
+def _receiver(source: Union[Queue, Channel, Coroutine, None]) -> Callable[[], Awaitable[List[int]]]:
+    """ next input values from source: everything a channel holds, one value otherwise """
+    if isinstance(source, Channel):
+        return source.get_many
+    if isinstance(source, Queue):
+        async def receive():
+            return [await source.get()]
+    else:
+        async def receive():
+            return [await source()]
+    return receive
+
+
+def _deliverer(target: Union[Queue, Channel, Coroutine, None]) -> Callable[[List[int]], Awaitable[None]]:
+    """ hands output values to target, a channel takes them all at once """
+    if isinstance(target, Channel):
+        return target.put_many
+    if isinstance(target, Queue):
+        async def deliver(values):
+            for value in values:
+                await target.put(value)
+    else:
+        async def deliver(values):
+            for value in values:
+                await target(value)
+    return deliver
+
+
+class Cluster:
+    """ Runs many machines in one loop, round-robin with a time slice of max_instructions each
+
+    A machine waiting for input with nothing queued is blocked and skipped until something is
+    sent to it. Machines always run in index order, so a run is deterministic. Outputs go to
+    the machine connected to their source, or else to on_output(index, outputs); without
+    either they stay with the machine.
+    """
+
+    def __init__(self, machines: Sequence[IntcodeComputer], time_slice: int = 1000):
+        self.machines = list(machines)
+        self.time_slice = time_slice
+        self.status: List[Optional[Status]] = [None] * len(self.machines)
+        self.on_output: Optional[Callable[[int, List[int]], None]] = None
+        self._links: Dict[int, int] = {}
+
+    def connect(self, source: int, target: int):
+        """ delivers the outputs of machine source as inputs of machine target """
+        self._links[source] = target
+
+    def send(self, index: int, *values: int):
+        self.machines[index].send(*values)
+
+    def halted(self, index: int) -> bool:
+        return self.status[index] is Status.HALTED
+
+    def blocked(self, index: int) -> bool:
+        """ whether the machine waits for input that has not been sent yet """
+        return self.status[index] is Status.NEEDS_INPUT and not self.machines[index]._state.inputs
+
+    def step(self) -> bool:
+        """ gives every machine that can run one time slice, returns False when none could """
+        progress = False
+        for index, machine in enumerate(self.machines):
+            if self.halted(index) or self.blocked(index):
+                continue
+
+            progress = True
+            self.status[index] = machine.run(max_instructions=self.time_slice)
+            if index in self._links:
+                self.machines[self._links[index]].send(*machine.take_outputs())
+            elif self.on_output is not None:
+                outputs = machine.take_outputs()
+                if outputs:
+                    self.on_output(index, outputs)
+        return progress
+
+    def run(self):
+        """ runs until every machine has halted or is blocked on input """
+        while self.step():
+            pass
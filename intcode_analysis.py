@@ -0,0 +1,493 @@
+""" Static analysis of Intcode programs: disassembly, basic blocks, control flow and writes
+
+    python intcode_analysis.py day13.txt     # annotated listing with loops and writes into code
+"""
+import sys
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Optional, Set, Tuple
+
+from intcode import INSTRUCTION_MAP
+from utils import read_intlist
+
+MNEMONICS = {1: 'add', 2: 'mul', 3: 'in', 4: 'out', 5: 'jt', 6: 'jf', 7: 'lt', 8: 'eq', 9: 'arb', 99: 'hlt'}
+WRITING = {1: 2, 2: 2, 3: 0, 7: 2, 8: 2}  # opcode -> index of the parameter written to
+JUMPS = {5, 6}
+
+
+@dataclass(frozen=True)
+class Decoded:
+    address: int
+    opcode: int
+    modes: Tuple[int, ...]
+    operands: Tuple[int, ...]
+
+    @property
+    def size(self) -> int:
+        return len(self.operands) + 1
+
+    @property
+    def cells(self) -> range:
+        return range(self.address, self.address + self.size)
+
+    def __str__(self):
+        parameters = []
+        for mode, operand in zip(self.modes, self.operands):
+            if mode == 0:
+                parameters.append(f'[{operand}]')
+            elif mode == 1:
+                parameters.append(f'{operand}')
+            else:
+                parameters.append(f'[rb{operand:+d}]')
+        return f'{MNEMONICS[self.opcode]:<4}{", ".join(parameters)}'
+
+
+@dataclass
+class BasicBlock:
+    start: int
+    instructions: List[Decoded] = field(default_factory=list)
+    successors: Set[int] = field(default_factory=set)
+    indirect: bool = False  # ends in a jump whose target is only known at runtime
+
+    @property
+    def end(self) -> int:
+        return self.instructions[-1].address + self.instructions[-1].size
+
+
+@dataclass
+class Analysis:
+    """ Result of analyze()
+
+    Writes are split in known writes, with an address range proven from the code, and unknown
+    writes (pointer stores, or relative writes with an unbounded base). The ranges assume the
+    structural_cells keep their value once the program runs. The AOT translation uses them to
+    pick the writes that need a check for self-modifying code.
+    """
+    program: List[int]
+    instructions: Dict[int, Decoded]
+    blocks: Dict[int, BasicBlock]
+    indirect_targets: Set[int]
+    write_ranges: Dict[int, Tuple[float, float]]  # known write instruction -> lowest, highest address
+    unknown_writes: Set[int]                      # write instructions with an unknown address
+    loops: List[Tuple[int, int]]                  # back edges (from block, to block)
+
+    @cached_property
+    def code_cells(self) -> Set[int]:
+        return {cell for decoded in self.instructions.values() for cell in decoded.cells}
+
+    @cached_property
+    def structural_cells(self) -> Set[int]:
+        """ cells the control flow and relative base depend on: opcodes and immediate operands
+        of jumps and relative base adjustments """
+        cells = set(self.instructions)
+        for address, decoded in self.instructions.items():
+            if decoded.opcode in JUMPS or decoded.opcode == 9:
+                cells.update(address + 1 + index for index, mode in enumerate(decoded.modes) if mode == 1)
+        return cells
+
+    @cached_property
+    def _known_targets(self) -> Tuple[Set[int], float]:
+        """ cells of the single cell known writes, and the lowest address any other one can hit """
+        cells = {low for low, high in self.write_ranges.values() if low == high}
+        lowest = min((low for low, high in self.write_ranges.values() if low != high), default=float('inf'))
+        return cells, lowest
+
+    def may_be_written(self, address: int) -> bool:
+        """ whether a known write can hit address """
+        cells, lowest = self._known_targets
+        return address in cells or address >= lowest
+
+    @cached_property
+    def overwritten_instructions(self) -> Set[int]:
+        """ instructions a known write can overwrite """
+        return {
+            address for address, decoded in self.instructions.items()
+            if any(self.may_be_written(cell) for cell in decoded.cells)
+        }
+
+
+def decode(program: List[int], address: int) -> Optional[Decoded]:
+    """ instruction at address, None when the cell does not hold a valid instruction """
+    if not (0 <= address < len(program)):
+        return None
+    value = program[address]
+    opcode = value % 100
+    if value < 0 or opcode not in INSTRUCTION_MAP:
+        return None
+
+    size = INSTRUCTION_MAP[opcode].size()
+    modes = tuple(value // 10 ** (i + 2) % 10 for i in range(size - 1))
+    if value >= 10 ** (size + 1) or any(mode > 2 for mode in modes):
+        return None
+    if opcode in WRITING and modes[WRITING[opcode]] == 1:
+        return None
+    if address + size > len(program):
+        return None
+    return Decoded(address, opcode, modes, tuple(program[address + 1:address + size]))
+
+
+def analyze(program: List[int]) -> Analysis:
+    """ disassembles everything reachable from address 0
+
+    Targets of computed jumps (like returns from a call) are taken from constants moved
+    into memory by add/multiply instructions, the usual way to push a return address, and
+    from jump tables: a jump reading its target from the cell an add of a table base wrote.
+    Jumps and relative base adjustments whose immediate operand is overwritten by the program
+    are analyzed again as reading that operand from memory.
+    """
+    patched: Set[int] = set()
+    while True:
+        analysis = _analyze(program, patched)
+        overwritten = {
+            cell for cell in analysis.structural_cells - set(analysis.instructions)
+            if analysis.may_be_written(cell)
+        }
+        if not overwritten:
+            return analysis
+        patched |= overwritten
+
+
+def _analyze(program: List[int], patched: Set[int]) -> Analysis:
+    instructions = _disassemble(program, {0}, patched)
+    indirect_targets = set()
+    while True:
+        targets = _indirect_targets(program, instructions)
+        if targets <= indirect_targets:
+            break
+        indirect_targets |= targets
+        instructions.update(_disassemble(program, targets - set(instructions), patched))
+    blocks = _basic_blocks(instructions, indirect_targets)
+    floors = _relative_base_floors(blocks, indirect_targets, _table_targets(program, instructions))
+
+    write_ranges = {}
+    unknown_writes = set()
+    for block in blocks.values():
+        relative_base = floors.get(block.start)
+        for decoded in block.instructions:
+            if decoded.opcode in WRITING:
+                index = WRITING[decoded.opcode]
+                operand = decoded.operands[index]
+                if decoded.modes[index] == 0:
+                    write_ranges[decoded.address] = (operand, operand)
+                elif relative_base is not None:
+                    write_ranges[decoded.address] = (relative_base + operand, float('inf'))
+                else:
+                    unknown_writes.add(decoded.address)
+            if decoded.opcode == 9:
+                relative_base = _adjust_floor(relative_base, decoded)
+
+    # a position mode write goes wherever its operand points, which is unknown once that is written
+    changed = True
+    while changed:
+        changed = False
+        for address, (low, high) in list(write_ranges.items()):
+            decoded = instructions[address]
+            if decoded.modes[WRITING[decoded.opcode]] != 0:
+                continue
+            operand_cell = address + 1 + WRITING[decoded.opcode]
+            if any(l <= operand_cell <= h for l, h in write_ranges.values()):
+                del write_ranges[address]
+                unknown_writes.add(address)
+                changed = True
+
+    return Analysis(program, instructions, blocks, indirect_targets, write_ranges,
+                    unknown_writes, _back_edges(blocks))
+
+
+def _disassemble(program: List[int], entries: Set[int], patched: Set[int]) -> Dict[int, Decoded]:
+    instructions = {}
+    worklist = list(entries)
+    while worklist:
+        address = worklist.pop()
+        if address in instructions:
+            continue
+        decoded = decode(program, address)
+        if decoded is None:
+            continue
+
+        if decoded.opcode in JUMPS or decoded.opcode == 9:
+            decoded = _read_patched_operands(decoded, patched)
+        instructions[address] = decoded
+        worklist.extend(_direct_successors(decoded))
+    return instructions
+
+
+def _read_patched_operands(decoded: Decoded, patched: Set[int]) -> Decoded:
+    """ an immediate operand in a patched cell behaves like a position mode read of that cell """
+    modes, operands = list(decoded.modes), list(decoded.operands)
+    for index, mode in enumerate(modes):
+        cell = decoded.address + 1 + index
+        if mode == 1 and cell in patched:
+            modes[index], operands[index] = 0, cell
+    return Decoded(decoded.address, decoded.opcode, tuple(modes), tuple(operands))
+
+
+def _direct_successors(decoded: Decoded) -> List[int]:
+    if decoded.opcode == 99:
+        return []
+    if decoded.opcode not in JUMPS:
+        return [decoded.address + decoded.size]
+
+    successors = []
+    condition_mode, target_mode = decoded.modes
+    condition, target = decoded.operands
+    always = condition_mode == 1 and ((condition != 0) == (decoded.opcode == 5))
+    never = condition_mode == 1 and not always
+    if not always:
+        successors.append(decoded.address + decoded.size)
+    if not never and target_mode == 1:
+        successors.append(target)
+    return successors
+
+
+def _is_computed_jump(decoded: Decoded) -> bool:
+    if decoded.opcode not in JUMPS or decoded.modes[1] == 1:
+        return False
+    condition_mode, condition = decoded.modes[0], decoded.operands[0]
+    # a jump that can never be taken does not jump anywhere
+    return not (condition_mode == 1 and ((condition != 0) != (decoded.opcode == 5)))
+
+
+def _indirect_targets(program: List[int], instructions: Dict[int, Decoded]) -> Set[int]:
+    targets = set()
+    for decoded in instructions.values():
+        constant = _moved_constant(decoded)
+        if constant is not None and _runs_into_jump(program, constant):
+            targets.add(constant)
+    return targets | _table_targets(program, instructions)
+
+
+def _table_targets(program: List[int], instructions: Dict[int, Decoded]) -> Set[int]:
+    """ entries of jump tables, like the dispatch on the input of days 7 and 23:
+
+        add [62], 11, [10]      ; cell 10 = table base 11 + index
+        jt  1, [0]              ; operand cell 10 patched, jumps to program[11 + index]
+
+    Entries are read from the base up to the first one that is no code address, or that is
+    a cell the program writes or executes, which ends the table.
+    """
+    code = {cell for decoded in instructions.values() for cell in decoded.cells}
+    written = {
+        decoded.operands[WRITING[decoded.opcode]] for decoded in instructions.values()
+        if decoded.opcode in WRITING and decoded.modes[WRITING[decoded.opcode]] == 0
+    }
+    targets = set()
+    for jump in instructions.values():
+        if not _is_computed_jump(jump) or jump.modes[1] != 0:
+            continue
+        operand_cell = jump.address + 2
+        for decoded in instructions.values():
+            base = _table_base(decoded, operand_cell)
+            if base is None:
+                continue
+            entry = base
+            while (0 <= entry < len(program) and entry not in code and entry not in written
+                   and 0 <= program[entry] < len(program) and _runs_into_jump(program, program[entry])):
+                targets.add(program[entry])
+                entry += 1
+    return targets
+
+
+def _table_base(decoded: Decoded, cell: int) -> Optional[int]:
+    """ immediate operand of an add writing cell in position mode, adding it to a variable """
+    if decoded.opcode != 1 or decoded.modes[2] != 0 or decoded.operands[2] != cell:
+        return None
+    if decoded.modes[1] == 1 and decoded.modes[0] != 1:
+        return decoded.operands[1]
+    if decoded.modes[0] == 1 and decoded.modes[1] != 1:
+        return decoded.operands[0]
+    return None
+
+
+def _runs_into_jump(program: List[int], address: int) -> bool:
+    """ whether straight-line decoding from address reaches a jump or halt, data usually does not """
+    decoded = decode(program, address)
+    while decoded is not None:
+        if decoded.opcode in JUMPS or decoded.opcode == 99:
+            return True
+        decoded = decode(program, decoded.address + decoded.size)
+    return False
+
+
+def _basic_blocks(instructions: Dict[int, Decoded], indirect_targets: Set[int]) -> Dict[int, BasicBlock]:
+    leaders = {0} | (indirect_targets & set(instructions))
+    for decoded in instructions.values():
+        if decoded.opcode in JUMPS or decoded.opcode == 99:
+            leaders.update(_direct_successors(decoded))
+            leaders.add(decoded.address + decoded.size)
+
+    blocks = {}
+    for start in sorted(leaders & set(instructions)):
+        block = BasicBlock(start)
+        address = start
+        while True:
+            decoded = instructions[address]
+            block.instructions.append(decoded)
+            address += decoded.size
+            if decoded.opcode in JUMPS or decoded.opcode == 99:
+                block.successors.update(_direct_successors(decoded))
+                if _is_computed_jump(decoded):
+                    block.indirect = True
+                    block.successors.update(indirect_targets & set(instructions))
+                break
+            if address in leaders or address not in instructions:
+                if address in instructions:
+                    block.successors.add(address)
+                break
+        blocks[start] = block
+    return blocks
+
+
+def _adjust_floor(floor: Optional[int], decoded: Decoded) -> Optional[int]:
+    if floor is None or decoded.modes[0] != 1:
+        return None
+    return floor + decoded.operands[0]
+
+
+def _moved_constant(decoded: Decoded) -> Optional[int]:
+    """ constant an add/multiply of two immediates stores unchanged, like a pushed return address """
+    if decoded.opcode not in (1, 2) or decoded.modes[0] != 1 or decoded.modes[1] != 1:
+        return None
+    a, b = decoded.operands[:2]
+    neutral = 0 if decoded.opcode == 1 else 1
+    if b == neutral:
+        return a
+    if a == neutral:
+        return b
+    return None
+
+
+def _call_sites(blocks: Dict[int, BasicBlock], indirect_targets: Set[int]) -> Dict[int, int]:
+    """ blocks that store a return address and then jump to a function: block -> return address """
+    calls = {}
+    for start, block in blocks.items():
+        last = block.instructions[-1]
+        if last.opcode not in JUMPS or block.indirect or len(block.successors) != 1:
+            continue
+        for decoded in block.instructions:
+            constant = _moved_constant(decoded)
+            if constant in indirect_targets:
+                calls[start] = constant
+    return calls
+
+
+def _calls_preserve_relative_base(blocks: Dict[int, BasicBlock], calls: Dict[int, int]) -> bool:
+    """ checks every function returns with the relative base it was entered with
+
+    Walks each function from its entry, skipping over the calls it makes, and requires a
+    single exact relative base offset per block and an offset of 0 at every return.
+    """
+    for entry in {target for start in calls for target in blocks[start].successors}:
+        offsets = {entry: 0}
+        worklist = [entry]
+        while worklist:
+            start = worklist.pop()
+            if start not in blocks:
+                return False
+            offset = offsets[start]
+            for decoded in blocks[start].instructions:
+                if decoded.opcode == 9:
+                    if decoded.modes[0] != 1:
+                        return False
+                    offset += decoded.operands[0]
+
+            if blocks[start].indirect:
+                if offset != 0:
+                    return False
+                continue
+
+            successors = [calls[start]] if start in calls else blocks[start].successors
+            for successor in successors:
+                if successor not in offsets:
+                    offsets[successor] = offset
+                    worklist.append(successor)
+                elif offsets[successor] != offset:
+                    return False
+    return True
+
+
+def _relative_base_floors(blocks: Dict[int, BasicBlock], indirect_targets: Set[int],
+                          table_targets: Set[int]) -> Dict[int, Optional[int]]:
+    """ lower bound of the relative base at the start of every block, None when unbounded
+
+    Returns are followed by assuming a call gets back to its return address with the relative
+    base it had, which is only done after _calls_preserve_relative_base confirmed it. Computed
+    jumps pass their floor on to the other indirect targets, jump table entries included.
+    """
+    calls = _call_sites(blocks, indirect_targets)
+    if not _calls_preserve_relative_base(blocks, calls):
+        return {}
+    returns = set(calls.values()) - table_targets
+
+    floors: Dict[int, Optional[int]] = {0: 0}
+    lowered = {}
+    worklist = [0]
+    while worklist:
+        start = worklist.pop()
+        if start not in blocks:
+            continue
+        floor = floors[start]
+        for decoded in blocks[start].instructions:
+            if decoded.opcode == 9:
+                floor = _adjust_floor(floor, decoded)
+
+        successors = set(blocks[start].successors)
+        if blocks[start].indirect:
+            successors -= returns
+        if start in calls:
+            successors.add(calls[start])
+        for successor in successors:
+            if successor in floors:
+                current = floors[successor]
+                if current is None or (floor is not None and floor >= current):
+                    continue
+                # widening: a floor that keeps going down is unbounded
+                lowered[successor] = lowered.get(successor, 0) + 1
+                floors[successor] = None if floor is None or lowered[successor] > len(blocks) else floor
+            else:
+                floors[successor] = floor
+            worklist.append(successor)
+    return floors
+
+
+def _back_edges(blocks: Dict[int, BasicBlock]) -> List[Tuple[int, int]]:
+    return sorted(
+        (start, successor)
+        for start, block in blocks.items()
+        for successor in block.successors
+        if successor <= start and not block.indirect)
+
+
+def listing(analysis: Analysis) -> str:
+    """ readable disassembly with block labels and loop headers
+
+    Instructions a known write can overwrite are marked with *, writes to an address that is
+    only known at runtime with ?.
+    """
+    loop_headers = {target: source for source, target in analysis.loops}
+    overwritten = analysis.overwritten_instructions
+    lines = []
+    for start, block in sorted(analysis.blocks.items()):
+        header = f'block_{start}:'
+        if start in loop_headers:
+            header += f'  ; loop, back edge from block_{loop_headers[start]}'
+        if start in analysis.indirect_targets:
+            header += '  ; computed jump target'
+        lines.append(header)
+        for decoded in block.instructions:
+            marker = '?' if decoded.address in analysis.unknown_writes else \
+                '*' if decoded.address in overwritten else ' '
+            lines.append(f'  {decoded.address:>6} {marker} {decoded}')
+        successors = ', '.join(f'block_{s}' for s in sorted(block.successors)) or '-'
+        lines.append(f'         -> {successors}{" (computed)" if block.indirect else ""}')
+
+    lines.append('')
+    lines.append(f'{len(analysis.instructions)} instructions in {len(analysis.blocks)} blocks, '
+                 f'{len(analysis.loops)} loops')
+    lines.append(f'{len(overwritten)} instructions overwritten by known writes (*), '
+                 f'{len(analysis.unknown_writes)} writes with an address only known at runtime (?)')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    print(listing(analyze(read_intlist(sys.argv[1]))))
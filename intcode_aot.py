@@ -0,0 +1,478 @@
+""" Ahead-of-time translation of whole Intcode programs into Python modules
+
+Every basic block the static analysis finds becomes a section of one run() function, picked
+by a binary search on the instruction pointer. Memory is the dense list of the machine's
+Memory, indexed with the operands inlined as constants. It covers the image plus a bounded
+window above it; addresses outside go to the Memory object, and a relative base outside
+the window continues in the interpreter, so sparse memory stays sparse. Operand cells the program may write are read from memory
+instead, so the pointer idiom (patching the address operand of the next instruction) stays
+compiled. Cells that are inlined are guarded: a write into them hands the machine to the
+interpreter. Instructions the analysis did not reach run in the interpreter, until the
+program arrives at the start of a block again, or at a point where a translated run stops.
+
+Generated modules are cached in input/__pycache__, keyed by the program hash:
+
+    python intcode_aot.py day13.txt     # prints the generated module
+"""
+import importlib.util
+import os
+import sys
+from types import ModuleType
+from typing import Deque, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple, Union
+
+from intcode import PAGE_BITS, PAGE_SIZE, IntcodeComputer, Memory, State, Status, program_hash
+from intcode_analysis import JUMPS, BasicBlock, Decoded, analyze, decode
+from intcode_image import load_image
+from utils import input_path
+
+# generated modules of another version are translated again
+VERSION = 7
+
+# run() results besides a Status: continue in the interpreter (an instruction the analysis
+# did not reach, or a relative base outside the window), a guarded write
+MISSED = 'missed'
+GUARD = 'guard'
+
+# leaves of the dispatch tree compare this many block addresses one by one
+LEAF_SIZE = 4
+# cells added at once when the dense list has to grow, a whole page
+GROWTH = PAGE_SIZE
+# cells the dense list may cover above the program image, beyond that memory stays paged
+WINDOW = 1 << 16
+
+BINARY_OPERATORS = {
+    1: '{a} + {b}',
+    2: '{a} * {b}',
+    7: '1 if {a} < {b} else 0',
+    8: '1 if {a} == {b} else 0',
+}
+
+Operand = Union[int, str]
+
+# translated modules by program cells, every machine of a program would hash it again otherwise
+_modules: Dict[Tuple[int, ...], ModuleType] = {}
+
+
+class AotState(State):
+    """ State of a transpiled machine, interpreted writes into guarded cells end the translation """
+
+    guarded: FrozenSet[int] = frozenset()
+    transpiled = True
+
+    def copy(self) -> 'AotState':
+        clone = super().copy()
+        clone.guarded = self.guarded
+        clone.transpiled = self.transpiled
+        return clone
+
+    def replace_memory(self, memory: Memory):
+        if any(memory.read(address) != self._memory.read(address) for address in self.guarded):
+            self.transpiled = False
+        super().replace_memory(memory)
+
+    def _write(self, address: int, value: int):
+        super()._write(address, value)
+        if address in self.guarded:
+            self.transpiled = False
+
+
+class StateIO:
+    """ I/O of a transpiled program: the inputs and outputs of a State
+
+    Any object with these two methods can be given to the run() of a generated module.
+    """
+
+    def __init__(self, state: State, output_limit: Optional[int] = None):
+        self.inputs: Deque[int] = state.inputs
+        self.outputs: List[int] = state.outputs
+        self.target = float('inf') if output_limit is None else len(self.outputs) + output_limit
+
+    def read(self) -> Optional[int]:
+        """ next input, None when there is none yet """
+        return self.inputs.popleft() if self.inputs else None
+
+    def write(self, value: int) -> bool:
+        """ stores an output, True when the program should stop for it """
+        self.outputs.append(value)
+        return len(self.outputs) >= self.target
+
+
+class Transpiler:
+    """ Generates the Python module for a program """
+
+    def __init__(self, program: Sequence[int]):
+        self.program = list(program)
+        self.analysis = analyze(self.program)
+        self.guarded: Set[int] = set(self.analysis.instructions)
+        # the dense list never grows beyond limit, page aligned like the pages merged into it
+        self.limit = -(-(len(self.program) + WINDOW) // PAGE_SIZE) * PAGE_SIZE
+        self.min_size = len(self.program)
+        self.min_relative = self.max_relative = 0
+        for address in self.analysis.instructions:
+            decoded = decode(self.program, address)
+            for index, mode in enumerate(decoded.modes):
+                operand = self._operand(address, index)
+                if isinstance(operand, int):
+                    self.guarded.add(address + 1 + index)
+                    if mode == 0 and self._dense(operand):
+                        self.min_size = max(self.min_size, operand + 1)
+                    elif mode == 2:
+                        self.min_relative = min(self.min_relative, operand)
+                        self.max_relative = max(self.max_relative, operand)
+
+    def source(self) -> str:
+        bodies = {}
+        for block in self.analysis.blocks.values():
+            bodies.update(self._sections(block))
+        lines = [
+            f'# Intcode program {program_hash(self.program)}, translated by intcode_aot',
+            'from intcode import Status',
+            '',
+            f'PROGRAM_HASH = {program_hash(self.program)!r}',
+            f'VERSION = {VERSION}',
+            f'GUARDED = frozenset().union({_ranges(self.guarded)})',
+            '# addresses run() continues from, other instructions are left to the interpreter',
+            f'ENTRIES = frozenset({sorted(bodies)!r})',
+            '# the dense list m has MIN_SIZE cells, and cells up to rb + MAX_RELATIVE, at most LIMIT,',
+            '# rb + MIN_RELATIVE is never negative',
+            f'MIN_SIZE = {self.min_size}',
+            f'MIN_RELATIVE = {self.min_relative}',
+            f'MAX_RELATIVE = {self.max_relative}',
+            f'LIMIT = {self.limit}',
+            '',
+            '',
+            '# negative addresses go to the Memory object too, a list would wrap them to its end',
+            'def _load(m, load, address):',
+            '    return m[address] if 0 <= address < len(m) else load(address)',
+            '',
+            '',
+            'def _store(m, store, address, value):',
+            '    if 0 <= address < len(m):',
+            '        m[address] = value',
+            '    else:',
+            '        store(address, value)',
+            '',
+            '',
+            'def run(m, ip, rb, load, store, read, write, budget):',
+            '    while True:',
+            '        if budget <= 0:',
+            '            status = Status.YIELDED',
+            '            break',
+            *_indent(_dispatch(sorted(bodies), bodies), 2),
+            f'        status = {MISSED!r}',
+            '        break',
+            '    return status, ip, rb, budget',
+            '',
+        ]
+        return '\n'.join(lines)
+
+    def _sections(self, block: BasicBlock) -> Dict[int, List[str]]:
+        """ the block from its start, and its rest from every point a run stops inside it: an
+        input waiting for a value, after an output, after a relative base adjustment that left
+        the window """
+        # the analysis may read patched operands, the translation decodes what is in memory
+        instructions = [decode(self.program, analyzed.address) for analyzed in block.instructions]
+        sections = {}
+        for index, decoded in enumerate(instructions):
+            if index == 0 or decoded.opcode == 3 or instructions[index - 1].opcode in (4, 9):
+                sections[decoded.address] = self._body(instructions[index:], block.end)
+        return sections
+
+    def _body(self, instructions: List[Decoded], end: int) -> List[str]:
+        count = len(instructions)
+        lines = [f'budget -= {count}']
+        for index, decoded in enumerate(instructions):
+            lines.extend(self._instruction(decoded, count - index))
+        if instructions[-1].opcode not in JUMPS and instructions[-1].opcode != 99:
+            lines.extend([f'ip = {end}', 'continue'])
+        return lines
+
+    def _instruction(self, decoded: Decoded, remaining: int) -> List[str]:
+        """ source of one instruction, remaining counts it and the ones after it in the block """
+        address, opcode = decoded.address, decoded.opcode
+        next_ip = address + decoded.size
+        if opcode in BINARY_OPERATORS:
+            value = BINARY_OPERATORS[opcode].format(a=self._value(decoded, 0), b=self._value(decoded, 1))
+            return self._store(decoded, 2, value, next_ip, remaining - 1)
+        if opcode == 3:
+            return [
+                'value = read()',
+                'if value is None:',
+                *_indent(_exit(address, 'Status.NEEDS_INPUT', remaining), 1),
+                *self._store(decoded, 0, 'value', next_ip, remaining - 1),
+            ]
+        if opcode == 4:
+            return [
+                f'if write({self._value(decoded, 0)}):',
+                *_indent(_exit(next_ip, 'Status.OUTPUT', remaining - 1), 1),
+            ]
+        if opcode in JUMPS:
+            condition = '!= 0' if opcode == 5 else '== 0'
+            lines = []
+            target = self._value(decoded, 1)
+            if not self._direct(decoded, 1):
+                # the interpreter reads the target even when the jump is not taken, which
+                # raises for a negative address
+                lines.append(f'target = {target}')
+                target = 'target'
+            return lines + [
+                f'if {self._value(decoded, 0)} {condition}:',
+                f'    ip = {target}',
+                'else:',
+                f'    ip = {next_ip}',
+                'continue',
+            ]
+        if opcode == 9:
+            return [
+                f'rb += {self._value(decoded, 0)}',
+                f'if rb + {self.min_relative} < 0 or rb + {self.max_relative} >= len(m):',
+                *_indent(_exit(next_ip, repr(MISSED), remaining - 1), 1),
+            ]
+        return _exit(address, 'Status.HALTED', remaining - 1)
+
+    def _operand(self, address: int, index: int) -> Operand:
+        """ operand as constant, or as memory read when the program may change it """
+        cell = address + 1 + index
+        if self.analysis.may_be_written(cell):
+            return f'm[{cell}]'
+        return self.program[cell]
+
+    def _value(self, decoded: Decoded, index: int) -> str:
+        operand = self._operand(decoded.address, index)
+        mode = decoded.modes[index]
+        if mode == 1:
+            return str(operand)
+        if mode == 0 and isinstance(operand, int):
+            return f'm[{operand}]' if self._dense(operand) else f'load({operand})'
+        if mode == 2 and isinstance(operand, int):
+            return f'm[rb + {operand}]'
+        return f'_load(m, load, {operand if mode == 0 else f"rb + {operand}"})'
+
+    def _direct(self, decoded: Decoded, index: int) -> bool:
+        """ whether the value of a parameter is immediate or indexes m, and cannot raise """
+        operand = self._operand(decoded.address, index)
+        mode = decoded.modes[index]
+        return mode == 1 or isinstance(operand, int) and (mode == 2 or self._dense(operand))
+
+    def _store(self, decoded: Decoded, index: int, value: str, next_ip: int, remaining: int) -> List[str]:
+        operand = self._operand(decoded.address, index)
+        mode = decoded.modes[index]
+        if isinstance(operand, int) and mode == 0 and not self._dense(operand):
+            return [f'store({operand}, {value})']
+        if isinstance(operand, int) and mode == 0:
+            lines = [f'm[{operand}] = {value}']
+            if operand in self.guarded:
+                lines.extend(_exit(next_ip, repr(GUARD), remaining))
+            return lines
+
+        if isinstance(operand, int):
+            lines = [f'm[rb + {operand}] = {value}']
+            target = f'rb + {operand}'
+        else:
+            lines = [f'target = {operand if mode == 0 else f"rb + {operand}"}', f'_store(m, store, target, {value})']
+            target = 'target'
+        # relative and pointer stores are checked whatever the analysis proved about them
+        lines.extend([f'if {target} in GUARDED:', *_indent(_exit(next_ip, repr(GUARD), remaining), 1)])
+        return lines
+
+    def _dense(self, address: int) -> bool:
+        """ whether a constant address is indexed in m directly: within the image and one page
+        above, data decoded as code would otherwise make every machine allocate the window """
+        return 0 <= address < len(self.program) + GROWTH
+
+
+def _exit(ip: Operand, status: str, unexecuted: int) -> List[str]:
+    lines = [f'ip = {ip}']
+    if unexecuted:
+        # the budget was taken for the whole block
+        lines.append(f'budget += {unexecuted}')
+    return lines + [f'status = {status}', 'break']
+
+
+def _dispatch(starts: List[int], bodies: Dict[int, List[str]]) -> List[str]:
+    """ binary search over block addresses, ending in short if/elif chains """
+    if len(starts) <= LEAF_SIZE:
+        lines = []
+        for index, start in enumerate(starts):
+            lines.append(f'{"if" if index == 0 else "elif"} ip == {start}:')
+            lines.extend(_indent(bodies[start], 1))
+        return lines
+
+    middle = len(starts) // 2
+    return [
+        f'if ip < {starts[middle]}:',
+        *_indent(_dispatch(starts[:middle], bodies), 1),
+        'else:',
+        *_indent(_dispatch(starts[middle:], bodies), 1),
+    ]
+
+
+def _ranges(cells: Set[int]) -> str:
+    """ cells as comma separated ranges of consecutive addresses """
+    ranges = []
+    for cell in sorted(cells):
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1][1] = cell + 1
+        else:
+            ranges.append([cell, cell + 1])
+    return ', '.join(f'range({low}, {high})' for low, high in ranges)
+
+
+def _indent(lines: List[str], levels: int) -> List[str]:
+    return ['    ' * levels + line for line in lines]
+
+
+def transpile(program: Sequence[int]) -> str:
+    """ source of the Python module running program """
+    return Transpiler(program).source()
+
+
+def load_module(program: Sequence[int]) -> ModuleType:
+    """ the translated module of program, from this process, the disk cache or translated now """
+    key = tuple(program)
+    module = _modules.get(key)
+    if module is not None:
+        return module
+
+    digest = program_hash(program)
+    path = input_path(os.path.join('__pycache__', f'aot_{digest[:32]}.py'))
+    module = _import(path, digest)
+    if module is None:
+        source = transpile(program)
+        if _write_module(path, source):
+            module = _import(path, digest)
+        if module is None:
+            # a read-only checkout still works, without the cache
+            module = ModuleType(f'intcode_aot_{digest[:16]}')
+            exec(compile(source, f'<intcode aot {digest[:16]}>', 'exec'), module.__dict__)
+    _modules[key] = module
+    return module
+
+
+def _import(path: str, digest: str) -> Optional[ModuleType]:
+    if not os.path.exists(path):
+        return None
+    spec = importlib.util.spec_from_file_location(f'intcode_aot_{digest[:16]}', path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except (OSError, SyntaxError):
+        return None
+    if getattr(module, 'VERSION', None) != VERSION or getattr(module, 'PROGRAM_HASH', None) != digest:
+        return None
+    return module
+
+
+def _write_module(path: str, source: str) -> bool:
+    temporary = f'{path}.{os.getpid()}'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary, 'w') as output:
+            output.write(source)
+        os.replace(temporary, path)
+    except OSError:
+        return False
+    return True
+
+
+def _dense_list(memory: Memory, size: int) -> List[int]:
+    """ the dense cells of memory as a private list of at least size cells, size is page
+    aligned when it grows so the pages it now covers are moved into it whole """
+    if memory._dense_shared:
+        memory._dense = list(memory._dense)
+        memory._dense_shared = False
+    dense = memory._dense
+    old = len(dense)
+    if old < size:
+        dense.extend([0] * (size - old))
+        for number in [number for number in memory._pages if number << PAGE_BITS < size]:
+            page = memory._pages.pop(number)
+            memory._shared_pages.discard(number)
+            start = number << PAGE_BITS
+            low = max(start, old)
+            dense[low:start + PAGE_SIZE] = page[low - start:]
+        memory._size = size
+    return dense
+
+
+class AotIntcodeComputer(IntcodeComputer):
+    """ IntcodeComputer running the ahead-of-time translation of its program
+
+    The translation holds for the program as loaded: a machine whose code gets overwritten
+    continues in the interpreter until it is reset.
+    """
+
+    state_class = AotState
+
+    def __init__(self, program: Union[Sequence[int], str], input_queue=None, output_queue=None,
+                 memory_class: type = Memory):
+        if memory_class is not Memory:
+            raise ValueError('Transpiled programs index a plain Memory directly')
+        super().__init__(program, input_queue, output_queue, memory_class)
+        self._module = load_module(self._program)
+        for state in (self._initial_state, self._state):
+            state.guarded = self._module.GUARDED
+
+    def run(self, output_limit: Optional[int] = None, max_instructions: Optional[int] = None) -> Status:
+        state = self._state
+        io = StateIO(state, output_limit)
+        budget = float('inf') if max_instructions is None else max_instructions
+        module = self._module
+        while state.transpiled:
+            dense = self._window(state) if state._instruction_pointer in module.ENTRIES else None
+            if dense is None:
+                # the analysis did not reach this instruction, or the relative base is outside the window
+                status, budget = self._interpret(io, budget)
+                if status is not None:
+                    return status
+                continue
+
+            memory = state._memory
+            status, state._instruction_pointer, state._relative_base, budget = module.run(
+                dense, state._instruction_pointer, state._relative_base,
+                memory.read, memory.write, io.read, io.write, budget)
+            # translated writes bypass the decode cache of the interpreter
+            state._decoded.clear()
+            if status == GUARD:
+                state.transpiled = False
+                break
+            if status != MISSED:
+                return status
+
+        limit = None if output_limit is None else io.target - len(state.outputs)
+        return IntcodeComputer.run(self, limit, None if max_instructions is None else budget)
+
+    def _interpret(self, io: StateIO, budget: float) -> Tuple[Optional[Status], float]:
+        """ interprets until the translation can continue, returns a Status when the run ends """
+        state = self._state
+        entries = self._module.ENTRIES
+        while budget > 0:
+            budget -= 1
+            status = state.opcode().instruction.execute(state)
+            if status is not None and (status is not Status.OUTPUT or len(state.outputs) >= io.target):
+                return status, budget
+            if state._instruction_pointer in entries and self._window(state) is not None:
+                return None, budget
+        return Status.YIELDED, budget
+
+    def _window(self, state: AotState) -> Optional[List[int]]:
+        """ the dense list covering what the translation indexes directly, None when the
+        relative base is outside the window """
+        module = self._module
+        if state._relative_base + module.MIN_RELATIVE < 0:
+            return None
+        needed = max(module.MIN_SIZE, state._relative_base + module.MAX_RELATIVE + 1)
+        if needed > module.LIMIT:
+            return None
+        size = len(state._memory._dense)
+        if needed > size:
+            size = min(module.LIMIT, -(-(needed + GROWTH) // PAGE_SIZE) * PAGE_SIZE)
+        return _dense_list(state._memory, size)
+
+
+def main():
+    print(transpile(load_image(sys.argv[1])))
+
+
+if __name__ == '__main__':
+    main()
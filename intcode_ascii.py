@@ -0,0 +1,73 @@
+from typing import List
+
+from intcode import IntcodeComputer, Status
+
+NEWLINE = 10
+
+
+class AsciiAdapter:
+    """ Line based I/O for programs that talk ASCII, like the vacuum robot of day 17
+
+    Outputs are collected in a bytearray and decoded a line or frame at a time. Values outside
+    the ASCII range (the amount of dust collected, say) are not text: they end up in values.
+    """
+
+    def __init__(self, computer: IntcodeComputer):
+        self.computer = computer
+        self.values: List[int] = []
+        self.status = None
+        self._buffer = bytearray()
+
+    @property
+    def halted(self) -> bool:
+        return self.status is Status.HALTED
+
+    def send_line(self, line: str):
+        """ queues line as input, followed by a newline """
+        self.computer.send(*line.encode('ascii'), NEWLINE)
+
+    def read_until_prompt(self) -> str:
+        """ runs until the program waits for input or halts, returns the text it printed """
+        self._fill()
+        text = self._buffer.decode('ascii')
+        self._buffer.clear()
+        return text
+
+    def read_frame(self) -> List[str]:
+        """ lines up to the next blank line, or up to the prompt when no blank line follows """
+        end = self._frame_end()
+        if end < 0:
+            self._fill()
+            end = self._frame_end()
+
+        if end < 0:
+            frame = self._buffer.decode('ascii')
+            self._buffer.clear()
+        else:
+            frame = self._buffer[:end].decode('ascii')
+            del self._buffer[:end + 2]
+        return frame.splitlines()
+
+    def _frame_end(self) -> int:
+        """ position of the blank line after the first frame, newlines before it are dropped """
+        start = 0
+        while start < len(self._buffer) and self._buffer[start] == NEWLINE:
+            start += 1
+        del self._buffer[:start]
+        return self._buffer.find(b'\n\n')
+
+    def _fill(self):
+        if self.halted:
+            return
+        self.status = self.computer.run()
+        outputs = self.computer.take_outputs()
+        if not outputs:
+            return
+        if 0 <= min(outputs) and max(outputs) < 128:
+            self._buffer.extend(outputs)
+            return
+        for value in outputs:
+            if 0 <= value < 128:
+                self._buffer.append(value)
+            else:
+                self.values.append(value)
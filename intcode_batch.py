@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterable, List, Sequence, Type, Union
+
+from intcode import IntcodeComputer, Status
+from intcode_image import load_image
+from intcode_shared import OverlayMemory, SharedImage
+
+Job = Callable[[IntcodeComputer, Any], Any]
+
+# the warm machine of a worker process, loaded once by _init_worker
+_computer: IntcodeComputer = None
+# shared program image the machine of the worker reads from, when the pool uses one
+_image: SharedImage = None
+
+
+def run_inputs(computer: IntcodeComputer, inputs: Sequence[int]) -> List[int]:
+    """ default job: runs a fresh machine on the inputs, returns all outputs """
+    computer.reset()
+    computer.send(*inputs)
+    if computer.run() is Status.NEEDS_INPUT:
+        raise ValueError(f'Program needs more input than {list(inputs)}')
+    return computer.take_outputs()
+
+
+def _init_worker(program: Union[List[int], SharedImage], computer_class: Type[IntcodeComputer]):
+    global _computer, _image
+    if isinstance(program, SharedImage):
+        _image = program
+        _computer = computer_class(program.cells, memory_class=OverlayMemory)
+    else:
+        _computer = computer_class(program)
+
+
+def _run_job(job: Job, argument: Any) -> Any:
+    return job(_computer, argument)
+
+
+class BatchExecutor:
+    """ Pool of worker processes that each keep a loaded machine for the same program
+
+    Jobs are module level functions getting the worker's machine and one argument,
+    they are expected to reset the machine themselves. With shared the program image is
+    placed in shared memory once, workers map it and only copy the pages they write to.
+    """
+
+    def __init__(self, program: Union[List[int], str], workers: int = None, computer_class: Type[IntcodeComputer] = IntcodeComputer,
+                 shared: bool = False):
+        if isinstance(program, str):
+            program = load_image(program)
+
+        self.workers = workers or os.cpu_count()
+        self._image = SharedImage(program) if shared else None
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self._image or program, computer_class))
+
+    def __enter__(self) -> 'BatchExecutor':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def map(self, arguments: Iterable[Any], job: Job = run_inputs, chunksize: int = None) -> List[Any]:
+        """ runs job for every argument, results are returned in order """
+        arguments = list(arguments)
+        if chunksize is None:
+            # a few chunks per worker keeps them busy without paying IPC per job
+            chunksize = max(1, len(arguments) // (self.workers * 4))
+        return list(self._executor.map(partial(_run_job, job), arguments, chunksize=chunksize))
+
+    def close(self):
+        self._executor.shutdown()
+        if self._image is not None:
+            self._image.close()
+
+
+def run_many(program: Union[List[int], str], input_vectors: Iterable[Sequence[int]], workers: int = None) -> List[List[int]]:
+    """ runs the program once for every input vector, returns the outputs in order """
+    with BatchExecutor(program, workers) as executor:
+        return executor.map(input_vectors)
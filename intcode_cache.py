@@ -0,0 +1,108 @@
+import json
+import sqlite3
+from collections import OrderedDict
+from typing import List, Optional, Set, Tuple, Type, Union
+
+from intcode import IntcodeComputer, Status, program_hash
+
+Key = Tuple[int, ...]
+
+
+class QueryCache:
+    """ Memoizes a program that behaves as a pure function of its inputs
+
+    A query runs a fresh machine on the inputs. When it halts, the outputs depend only on the
+    inputs it consumed, so they are stored under that input prefix: in an in-memory LRU of
+    maxsize entries and, when path is given, in a sqlite database shared across runs.
+    """
+
+    def __init__(self, program: Union[List[int], str], maxsize: int = 4096, path: str = None,
+                 computer_class: Type[IntcodeComputer] = IntcodeComputer):
+        self._computer = computer_class(program)
+        self.program_hash = program_hash(self._computer._program)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results: OrderedDict = OrderedDict()
+        # numbers of inputs consumed by the program before it halted
+        self._prefix_lengths: Set[int] = set()
+
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'program TEXT, inputs TEXT, consumed INTEGER, outputs TEXT, PRIMARY KEY (program, inputs))')
+            rows = self._db.execute(
+                'SELECT DISTINCT consumed FROM results WHERE program = ?', (self.program_hash,))
+            self._prefix_lengths.update(consumed for (consumed,) in rows)
+
+    def __enter__(self) -> 'QueryCache':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def query(self, *inputs: int) -> List[int]:
+        """ outputs of the program for these inputs, from cache when possible """
+        for length in sorted(self._prefix_lengths):
+            if length <= len(inputs):
+                outputs = self._lookup(inputs[:length])
+                if outputs is not None:
+                    self.hits += 1
+                    return list(outputs)
+
+        self.misses += 1
+        key, outputs = self._execute(inputs)
+        self._store(key, outputs)
+        return list(outputs)
+
+    def flush(self):
+        if self._db is not None:
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
+
+    def _execute(self, inputs: Key) -> Tuple[Key, Key]:
+        computer = self._computer
+        computer.reset()
+        computer.send(*inputs)
+        if computer.run() is not Status.HALTED:
+            raise ValueError(f'Program needs more input than {list(inputs)}, it is not a pure query')
+
+        consumed = len(inputs) - len(computer._state.inputs)
+        self._prefix_lengths.add(consumed)
+        return inputs[:consumed], tuple(computer.take_outputs())
+
+    def _lookup(self, key: Key) -> Optional[Key]:
+        outputs = self._results.get(key)
+        if outputs is not None:
+            self._results.move_to_end(key)
+            return outputs
+
+        if self._db is not None:
+            row = self._db.execute(
+                'SELECT outputs FROM results WHERE program = ? AND inputs = ?',
+                (self.program_hash, json.dumps(key))).fetchone()
+            if row is not None:
+                outputs = tuple(json.loads(row[0]))
+                self._remember(key, outputs)
+                return outputs
+        return None
+
+    def _store(self, key: Key, outputs: Key):
+        self._remember(key, outputs)
+        if self._db is not None:
+            self._db.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                (self.program_hash, json.dumps(key), len(key), json.dumps(outputs)))
+
+    def _remember(self, key: Key, outputs: Key):
+        self._results[key] = outputs
+        self._results.move_to_end(key)
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
@@ -0,0 +1,107 @@
+import asyncio
+from collections import deque
+from typing import Deque, Iterable, List, Optional
+
+
+class Channel:
+    """ Queue of values from one producer to one consumer, lighter than asyncio.Queue
+
+    Values live in a deque, a future is only created when a side actually has to wait.
+    put_many and get_many move whole batches, with maxsize > 0 the producer waits while
+    the channel is full. Used as input or output queue of IntcodeComputer.execute().
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self.maxsize = maxsize
+        self._values: Deque[int] = deque()
+        self._getter: Optional[asyncio.Future] = None
+        self._putter: Optional[asyncio.Future] = None
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def qsize(self) -> int:
+        return len(self._values)
+
+    def empty(self) -> bool:
+        return not self._values
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= len(self._values)
+
+    def put_nowait(self, value: int):
+        if self.full():
+            raise asyncio.QueueFull
+        self._values.append(value)
+        self._wake_getter()
+
+    async def put(self, value: int):
+        while self.full():
+            await self._wait_for_room()
+        self._values.append(value)
+        self._wake_getter()
+
+    async def put_many(self, values: Iterable[int]):
+        """ puts all values, waiting for room in between when the channel is bounded """
+        if not self.maxsize:
+            self._values.extend(values)
+            self._wake_getter()
+            return
+
+        values = list(values)
+        start = 0
+        while start < len(values):
+            while self.full():
+                await self._wait_for_room()
+            end = start + self.maxsize - len(self._values)
+            self._values.extend(values[start:end])
+            self._wake_getter()
+            start = end
+
+    def get_nowait(self) -> int:
+        if not self._values:
+            raise asyncio.QueueEmpty
+        value = self._values.popleft()
+        self._wake_putter()
+        return value
+
+    async def get(self) -> int:
+        while not self._values:
+            await self._wait_for_values()
+        value = self._values.popleft()
+        self._wake_putter()
+        return value
+
+    async def get_many(self, limit: int = None) -> List[int]:
+        """ waits for at least one value, returns all values there are (at most limit) """
+        while not self._values:
+            await self._wait_for_values()
+        if limit is None or limit >= len(self._values):
+            values = list(self._values)
+            self._values.clear()
+        else:
+            values = [self._values.popleft() for _ in range(limit)]
+        self._wake_putter()
+        return values
+
+    async def _wait_for_values(self):
+        self._getter = asyncio.get_running_loop().create_future()
+        try:
+            await self._getter
+        finally:
+            self._getter = None
+
+    async def _wait_for_room(self):
+        self._putter = asyncio.get_running_loop().create_future()
+        try:
+            await self._putter
+        finally:
+            self._putter = None
+
+    def _wake_getter(self):
+        if self._getter is not None and not self._getter.done():
+            self._getter.set_result(None)
+
+    def _wake_putter(self):
+        if self._putter is not None and not self._putter.done():
+            self._putter.set_result(None)
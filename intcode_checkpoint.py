@@ -0,0 +1,119 @@
+""" Checkpoints of a running machine on disk
+
+A checkpoint holds memory, instruction pointer, relative base, pending inputs, outputs not
+taken yet and a JSON value with controller state (a partially assembled packet, a score).
+Restoring maps the file: memory reads go straight to the mapped cells and a page is only
+copied when the program writes to it. A NIC of day 23 would keep its half sent packet with
+the machine:
+
+    save_checkpoint(nic.computer, 'nic0.checkpoint', asdict(nic.state))
+    nic.state = NicState(**load_checkpoint(nic.computer, 'nic0.checkpoint'))
+"""
+import json
+import mmap
+import os
+import struct
+from array import array
+from typing import Any, List, Sequence, Tuple, Union
+
+from intcode import IntcodeComputer, State, program_hash
+
+# magic, program hash, instruction pointer, relative base, number of pages
+HEADER = struct.Struct('<4s4x64sqqq')
+MAGIC = b'ICC1'
+
+# kind of cell encoding, number of cells or bytes
+SECTION = struct.Struct('<qq')
+INT64 = 0
+TEXT = 1  # cells beyond int64, as comma separated text
+
+
+def save_checkpoint(computer: IntcodeComputer, path: str, extra: Any = None):
+    """ writes the state of computer to path, extra is stored as JSON next to it """
+    state = computer._state
+    memory = state._memory
+    pages = sorted(memory._pages.items())
+    # a machine restored from path still maps the old file, so it is replaced instead of overwritten
+    temporary = f'{path}.{os.getpid()}'
+    with open(temporary, 'wb') as output:
+        output.write(HEADER.pack(MAGIC, program_hash(computer._program).encode(),
+                                 state._instruction_pointer, state._relative_base, len(pages)))
+        _write_cells(output, memory._dense)
+        for number, page in pages:
+            output.write(struct.pack('<q', number))
+            _write_cells(output, page)
+        _write_cells(output, list(state.inputs))
+        _write_cells(output, state.outputs)
+        _write_text(output, json.dumps(extra).encode())
+    os.replace(temporary, path)
+
+
+def load_checkpoint(computer: IntcodeComputer, path: str) -> Any:
+    """ continues computer from the checkpoint at path, returns the extra value saved with it
+
+    The restored state starts as a copy of the initial state of computer, so what its state
+    class keeps (an attached debugger, compiled code still matching memory) carries over.
+    Memory is of the class computer was built with, over the mapped file.
+    """
+    with open(path, 'rb') as source:
+        mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    magic, program, instruction_pointer, relative_base, page_count = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not an Intcode checkpoint')
+    if program.decode() != program_hash(computer._program):
+        raise ValueError(f'{path} is a checkpoint of a different program')
+
+    offset = HEADER.size
+    dense, offset = _read_cells(view, offset)
+    pages = {}
+    for _ in range(page_count):
+        (number,) = struct.unpack_from('<q', view, offset)
+        pages[number], offset = _read_cells(view, offset + 8)
+    inputs, offset = _read_cells(view, offset)
+    outputs, offset = _read_cells(view, offset)
+    extra, offset = _read_text(view, offset)
+
+    state: State = computer._initial_state.copy()
+    state.replace_memory(type(state._memory).over_buffers(dense, pages))
+    state._instruction_pointer = instruction_pointer
+    state._relative_base = relative_base
+    state.inputs.clear()
+    state.inputs.extend(inputs)
+    state.outputs = list(outputs)
+    computer._state = state
+    return json.loads(bytes(extra))
+
+
+def _write_cells(output, cells: Sequence[int]):
+    try:
+        data = array('q', cells).tobytes()
+    except OverflowError:
+        output.write(SECTION.pack(TEXT, 0))
+        _write_text(output, ','.join(map(str, cells)).encode())
+        return
+    output.write(SECTION.pack(INT64, len(data) // 8))
+    output.write(data)
+
+
+def _write_text(output, data: bytes):
+    output.write(struct.pack('<q', len(data)))
+    # keep the next section 8 byte aligned
+    output.write(data + bytes(-len(data) % 8))
+
+
+def _read_cells(view: memoryview, offset: int) -> Tuple[Union[memoryview, List[int]], int]:
+    kind, count = SECTION.unpack_from(view, offset)
+    offset += SECTION.size
+    if kind == TEXT:
+        text, offset = _read_text(view, offset)
+        return [int(s) for s in bytes(text).split(b',') if s], offset
+    end = offset + count * 8
+    return view[offset:end].cast('q'), end
+
+
+def _read_text(view: memoryview, offset: int) -> Tuple[memoryview, int]:
+    (length,) = struct.unpack_from('<q', view, offset)
+    offset += 8
+    return view[offset:offset + length], offset + length + (-length % 8)
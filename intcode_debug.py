@@ -0,0 +1,196 @@
+""" Breakpoints and watchpoints for the interpreter
+
+A breakpoint replaces the decoded instruction at its address by a handler that stops the run
+with Status.BREAK before the instruction executes; the next run executes it and continues.
+Watchpoints stop right after the instruction writing a watched cell. The state of a debugged
+machine becomes a DebugState for the writes, detaching restores the plain State, so machines
+without a debugger run the unchanged interpreter loop.
+
+    debugger = Debugger(computer)
+    debugger.break_at(1014, lambda state: state.inputs and state.inputs[0] == 2)
+    debugger.watch(392)
+    while computer.run() is Status.BREAK:
+        print(debugger.stop)
+
+execute() returns Status.BREAK the same way, awaiting it again continues the run.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from intcode import Instruction, IntcodeComputer, Memory, Opcode, State, Status
+from intcode_aot import AotIntcodeComputer
+from intcode_jit import JitIntcodeComputer
+
+BREAKPOINT = 'breakpoint'
+WATCHPOINT = 'watchpoint'
+
+Condition = Callable[[State], bool]
+WatchCondition = Callable[[int], bool]
+
+
+class Stop(NamedTuple):
+    kind: str  # BREAKPOINT or WATCHPOINT
+    address: int  # address of the breakpoint or the watched cell
+    instruction_pointer: int  # instruction stopped at, or the one that wrote the cell
+    value: Optional[int] = None  # value written to the watched cell
+
+
+class _HandlerOpcode(Opcode):
+    """ decoded instruction with its parameter modes, handled by a debugger instruction """
+
+    def __init__(self, original: Opcode, instruction: Instruction):
+        self.opcode = original.opcode
+        self.parameter_modes = original.parameter_modes
+        self.instruction = instruction
+        self.original = original
+
+
+class _Breakpoint(Instruction):
+    def __init__(self, debugger: 'Debugger', address: int, original: Instruction):
+        self.debugger = debugger
+        self.address = address
+        self.original = original
+
+    def size(self) -> int:
+        return self.original.size()
+
+    def execute(self, state):
+        if state._resuming:
+            state._resuming = False
+        else:
+            condition = self.debugger.breakpoints[self.address]
+            if condition is None or condition(state):
+                state._resuming = True
+                self.debugger.stop = Stop(BREAKPOINT, self.address, self.address)
+                return Status.BREAK
+
+        status = self.original.execute(state)
+        if status is Status.NEEDS_INPUT:
+            # run again once input arrives, without stopping a second time
+            state._resuming = True
+        return status
+
+
+class _Stopped(Instruction):
+    """ ends the run after a watched write, without executing anything """
+
+    def size(self) -> int:
+        return 0
+
+    def execute(self, state):
+        return Status.BREAK
+
+
+_STOPPED = _HandlerOpcode(Opcode(99), _Stopped())
+
+
+class DebugState(State):
+    """ State of a machine with a Debugger attached, checking writes against it """
+
+    debugger: 'Debugger'
+    _resuming = False  # the breakpoint at the instruction pointer has stopped the run already
+
+    def copy(self) -> 'DebugState':
+        clone = super().copy()
+        clone.debugger = self.debugger
+        if '_resuming' in self.__dict__:
+            clone._resuming = self._resuming
+        return clone
+
+    def replace_memory(self, memory: Memory):
+        super().replace_memory(memory)
+        # breakpoints on instructions the new memory changed go with their decoding
+        for address in self.debugger.breakpoints:
+            self.debugger._install(self, address)
+
+    def _write(self, address: int, value: int):
+        super()._write(address, value)
+        debugger = self.debugger
+        if address in debugger.breakpoints:
+            # the breakpoint went with the overwritten instruction
+            debugger._install(self, address)
+
+        if address in debugger.watchpoints:
+            condition = debugger.watchpoints[address]
+            if condition is None or condition(value):
+                debugger.stop = Stop(WATCHPOINT, address, self._instruction_pointer, value)
+                # the write is the last thing an instruction does, the next dispatch stops
+                self.opcode = self._stopped
+
+    def _stopped(self) -> Opcode:
+        del self.opcode
+        return _STOPPED
+
+
+class Debugger:
+    """ Breakpoints and watchpoints on one interpreted machine, until detach()
+
+    Conditions are optional: a breakpoint condition gets the state before the instruction
+    executes, a watchpoint condition the value written. The debugger survives reset(),
+    snapshots taken before it was attached restore a machine without it.
+    """
+
+    def __init__(self, computer: IntcodeComputer):
+        if isinstance(computer, (JitIntcodeComputer, AotIntcodeComputer)):
+            raise ValueError('Compiled code bypasses breakpoints, debug with IntcodeComputer')
+
+        self.computer = computer
+        self.breakpoints: Dict[int, Optional[Condition]] = {}
+        self.watchpoints: Dict[int, Optional[WatchCondition]] = {}
+        self.stop: Optional[Stop] = None  # what stopped the last run with Status.BREAK
+        self._state_class = type(computer._state)
+        computer._initial_state = self._attach(computer._initial_state)
+        computer._state = self._attach(computer._state)
+
+    def break_at(self, address: int, condition: Condition = None):
+        """ stops before the instruction at address executes, when condition holds """
+        self.breakpoints[address] = condition
+        for state in self._states():
+            self._install(state, address)
+
+    def watch(self, address: int, condition: WatchCondition = None):
+        """ stops after an instruction writes to address, when condition holds for the value """
+        self.watchpoints[address] = condition
+
+    def clear(self, address: int):
+        """ removes the breakpoint and watchpoint at address """
+        self.watchpoints.pop(address, None)
+        if self.breakpoints.pop(address, 0) != 0:
+            for state in self._states():
+                self._uninstall(state, address)
+
+    def detach(self):
+        """ removes every breakpoint, the machine runs the plain interpreter again """
+        for state in self._states():
+            for address in self.breakpoints:
+                self._uninstall(state, address)
+            state.__class__ = self._state_class
+            state.__dict__.pop('debugger', None)
+            state.__dict__.pop('_resuming', None)
+            state.__dict__.pop('opcode', None)
+        self.breakpoints.clear()
+        self.watchpoints.clear()
+
+    def _attach(self, state: State) -> DebugState:
+        state = state.copy()
+        state.__class__ = DebugState
+        state.debugger = self
+        return state
+
+    def _states(self) -> List[State]:
+        return [self.computer._initial_state, self.computer._state]
+
+    def _install(self, state: State, address: int):
+        decoded = state._decoded.get(address)
+        if isinstance(decoded, _HandlerOpcode):
+            return
+        try:
+            original = decoded or Opcode(state._read(address))
+        except KeyError:
+            # not an instruction (yet), installed again when the cell is written
+            return
+        state._decoded[address] = _HandlerOpcode(original, _Breakpoint(self, address, original.instruction))
+
+    def _uninstall(self, state: State, address: int):
+        decoded = state._decoded.get(address)
+        if isinstance(decoded, _HandlerOpcode):
+            state._decoded[address] = decoded.original
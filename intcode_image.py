@@ -0,0 +1,98 @@
+import os
+import struct
+from array import array
+from typing import Dict, Optional, Tuple
+
+from utils import input_path
+
+Image = Tuple[int, ...]
+
+# magic, source mtime in ns, source size, number of cells
+HEADER = struct.Struct('<4sqqq')
+MAGIC = b'ICI1'
+
+# parsed images by source path, with the mtime and size they were parsed at
+_images: Dict[str, Tuple[int, int, Image]] = {}
+# int64 cells of the images in _images by id, for CompactMemory
+_cells: Dict[int, array] = {}
+
+
+def load_image(input_file: str) -> Image:
+    """ program of input_file as an immutable image, shared by every machine loading it
+
+    The text is parsed once per process. Parsed images are also cached as int64 cells in
+    __pycache__ next to the source, so a cold start only has to parse when the source changed.
+    """
+    path = input_path(input_file)
+    stat = os.stat(path)
+    cached = _images.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    cache_path = _cache_path(path)
+    cells = _read_cache(cache_path, stat)
+    if cells is not None:
+        image = tuple(cells)
+    else:
+        with open(path) as source:
+            image = tuple(int(s) for s in source.readline().split(','))
+        try:
+            cells = array('q', image)
+            _write_cache(cache_path, stat, cells)
+        except OverflowError:
+            # bigint cells do not fit, this program is parsed from text every time
+            pass
+
+    if cached is not None:
+        _cells.pop(id(cached[2]), None)
+    _images[path] = (stat.st_mtime_ns, stat.st_size, image)
+    if cells is not None:
+        _cells[id(image)] = cells
+    return image
+
+
+def image_cells(image: Image) -> Optional[array]:
+    """ the cells of an image from load_image as int64 array, None for any other sequence
+
+    The array is shared by every caller and must be copied before writing to it.
+    """
+    return _cells.get(id(image))
+
+
+def clear_images():
+    """ forgets the parsed images of this process, the cache files stay """
+    _images.clear()
+    _cells.clear()
+
+
+def _cache_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, '__pycache__', name + '.image')
+
+
+def _read_cache(cache_path: str, stat: os.stat_result) -> Optional[array]:
+    try:
+        with open(cache_path, 'rb') as cache:
+            magic, mtime, size, count = HEADER.unpack(cache.read(HEADER.size))
+            if (magic, mtime, size) != (MAGIC, stat.st_mtime_ns, stat.st_size):
+                return None
+            cells = array('q')
+            cells.frombytes(cache.read())
+    except (OSError, struct.error, ValueError):
+        return None
+    if len(cells) != count:
+        return None
+    return cells
+
+
+def _write_cache(cache_path: str, stat: os.stat_result, cells: array):
+    temporary = f'{cache_path}.{os.getpid()}'
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temporary, 'wb') as cache:
+            cache.write(HEADER.pack(MAGIC, stat.st_mtime_ns, stat.st_size, len(cells)))
+            cache.write(cells.tobytes())
+        os.replace(temporary, cache_path)
+    except OSError:
+        # a read-only checkout still works, just without the cache
+        pass
@@ -0,0 +1,341 @@
+import logging
+from typing import (Callable, Dict, FrozenSet, List, Optional, Sequence, Set,
+                    Tuple, Type, Union)
+
+from intcode import (AddInstruction, AdjustRelativeBaseInstruction,
+                     EqualsInstruction, InputInstruction, IntcodeComputer,
+                     JumpIfFalseInstruction, JumpIfTrueInstruction,
+                     LessThanInstruction, Memory, MultiplyInstruction, Opcode,
+                     OutputInstruction, State, Status)
+
+LOG = logging.getLogger(__name__)
+
+Block = Callable[[State], Optional[Status]]
+
+# number of times the interpreter has to arrive at an address before it gets compiled
+HOT_THRESHOLD = 8
+
+BINARY_OPERATORS = {
+    AddInstruction: '{a} + {b}',
+    MultiplyInstruction: '{a} * {b}',
+    LessThanInstruction: '1 if {a} < {b} else 0',
+    EqualsInstruction: '1 if {a} == {b} else 0',
+}
+
+JUMP_CONDITIONS = {
+    JumpIfTrueInstruction: '!= 0',
+    JumpIfFalseInstruction: '== 0',
+}
+
+
+class JitState(State):
+    """ State that knows which memory cells are inlined in compiled blocks """
+
+    def __init__(self, program: Sequence[int], memory_class: Type[Memory] = Memory):
+        super().__init__(program, memory_class)
+        self.blocks: Dict[int, Block] = {}
+        self.visits: Dict[int, int] = {}
+        # cells that were overwritten after being compiled, their value is read at runtime
+        self.volatile: Set[int] = set()
+        self._compiled_cells: Dict[int, FrozenSet[int]] = {}
+
+    def copy(self) -> 'JitState':
+        clone = super().copy()
+        clone.blocks = dict(self.blocks)
+        clone.visits = dict(self.visits)
+        clone.volatile = set(self.volatile)
+        clone._compiled_cells = dict(self._compiled_cells)
+        return clone
+
+    def replace_memory(self, memory: Memory):
+        changed = {address for address in self._compiled_cells
+                   if memory.read(address) != self._memory.read(address)}
+        for address in changed:
+            self.volatile.add(address)
+            for start in self._compiled_cells.pop(address):
+                self.blocks.pop(start, None)
+                self.visits.pop(start, None)
+        super().replace_memory(memory)
+
+    def register_block(self, start: int, cells: Set[int], block: Block):
+        self.blocks[start] = block
+        for address in cells:
+            # owner sets are replaced, not updated, so copies can share them
+            self._compiled_cells[address] = self._compiled_cells.get(address, frozenset()) | {start}
+
+    def _write(self, address: int, value: int) -> bool:
+        """ writes value, returns True when compiled code had to be invalidated """
+        self._memory.write(address, value)
+        if address in self._decoded:
+            del self._decoded[address]
+        if address not in self._compiled_cells:
+            return False
+
+        owners = self._compiled_cells.pop(address)
+
+        LOG.debug('Write to %d invalidates blocks %r', address, owners)
+        self.volatile.add(address)
+        for start in owners:
+            self.blocks.pop(start, None)
+            # let the block become hot again before it gets recompiled
+            self.visits.pop(start, None)
+        return True
+
+
+class BlockCompiler:
+    """ Translates a run of straight-line instructions into a Python function
+
+    A block ends after the first jump or output instruction, or before the first halt.
+    """
+
+    def __init__(self, state: JitState):
+        self._state = state
+
+    def compile(self, start: int) -> Optional[Tuple[Set[int], Block]]:
+        """ compiles the block starting at start, returns the inlined memory cells and the function """
+        instructions = self._find_block(start)
+        if not instructions:
+            return None
+
+        end = instructions[-1][0] + instructions[-1][1].instruction.size()
+        cells = set(range(start, end)) - self._state.volatile
+        lines = [
+            'def block(state):',
+            '    read = state._memory.read',
+            '    write = state._write',
+            '    rb = state._relative_base',
+        ]
+        for address, opcode in instructions:
+            lines.extend('    ' + line for line in self._translate(address, opcode, cells))
+
+        last = type(instructions[-1][1].instruction)
+        if last is OutputInstruction:
+            lines.extend('    ' + line for line in self._exit(end, 'Status.OUTPUT'))
+        elif last not in JUMP_CONDITIONS:
+            lines.extend('    ' + line for line in self._exit(end))
+
+        source = '\n'.join(lines)
+        namespace = {'Status': Status}
+        exec(compile(source, f'<intcode block {start}>', 'exec'), namespace)
+        block = namespace['block']
+        # instructions per call, for the budget of run(max_instructions=...)
+        block.size = len(instructions)
+        return cells, block
+
+    def _find_block(self, start: int) -> List[Tuple[int, Opcode]]:
+        """ decodes instructions up to and including the first jump or output """
+        instructions = []
+        address = start
+        while True:
+            try:
+                opcode = Opcode(self._state._read(address))
+            except (KeyError, IndexError):
+                break
+            if address in self._state.volatile or any(mode > 2 for mode in opcode.parameter_modes):
+                break
+            instruction = type(opcode.instruction)
+            if instruction in BINARY_OPERATORS:
+                if opcode.parameter_mode(2) == 1:
+                    break
+            elif instruction is InputInstruction:
+                if opcode.parameter_mode(0) == 1:
+                    break
+            elif instruction in JUMP_CONDITIONS or instruction is OutputInstruction:
+                instructions.append((address, opcode))
+                break
+            elif instruction is not AdjustRelativeBaseInstruction:
+                break
+
+            instructions.append((address, opcode))
+            address += opcode.instruction.size()
+        return instructions
+
+    def _translate(self, address: int, opcode: Opcode, cells: Set[int]) -> List[str]:
+        instruction = type(opcode.instruction)
+        next_ip = address + opcode.instruction.size()
+
+        if instruction in BINARY_OPERATORS:
+            a = self._parameter(address, opcode, 0)
+            b = self._parameter(address, opcode, 1)
+            value = BINARY_OPERATORS[instruction].format(a=a, b=b)
+            return self._write(address, opcode, 2, value, cells, next_ip)
+
+        if instruction is InputInstruction:
+            # stay on the input instruction until the input is there
+            return [
+                'if not state.inputs:',
+            ] + ['    ' + line for line in self._exit(address, 'Status.NEEDS_INPUT')] + \
+                self._write(address, opcode, 0, 'state.inputs.popleft()', cells, next_ip)
+
+        if instruction is OutputInstruction:
+            return [f'state.outputs.append({self._parameter(address, opcode, 0)})']
+
+        if instruction is AdjustRelativeBaseInstruction:
+            return [f'rb += {self._parameter(address, opcode, 0)}']
+
+        condition = JUMP_CONDITIONS[instruction]
+        lines = []
+        value = self._parameter(address, opcode, 0)
+        target = self._parameter(address, opcode, 1)
+        if opcode.parameter_mode(1) != 1:
+            # the interpreter reads the target even when the jump is not taken, which
+            # raises for a negative address
+            lines.extend([f'value = {value}', f'target = {target}'])
+            value, target = 'value', 'target'
+        return lines + [
+            f'if {value} {condition}:',
+            f'    state._instruction_pointer = {target}',
+            'else:',
+            f'    state._instruction_pointer = {next_ip}',
+            'state._relative_base = rb',
+        ]
+
+    def _write(self, address: int, opcode: Opcode, index: int, value: str, cells: Set[int], next_ip: int) -> List[str]:
+        target, constant = self._target(address, opcode, index)
+        if constant and target not in cells:
+            return [f'write({target}, {value})']
+        # the write may modify code of this block, leave as soon as that happens
+        return [f'if write({target}, {value}):'] + ['    ' + line for line in self._exit(next_ip)]
+
+    def _parameter(self, address: int, opcode: Opcode, index: int) -> str:
+        value = self._operand(address + index + 1)
+        mode = opcode.parameter_mode(index)
+        if mode == 0:
+            return f'read({value})'
+        elif mode == 1:
+            return f'{value}'
+        elif mode == 2:
+            return f'read(rb + {value})'
+        else:
+            raise ValueError(f'Unsupported parameter_mode {mode} for reading')
+
+    def _target(self, address: int, opcode: Opcode, index: int) -> Tuple[str, bool]:
+        """ write address as source, plus whether it is known at compile time """
+        value = self._operand(address + index + 1)
+        mode = opcode.parameter_mode(index)
+        if mode == 0:
+            return value, isinstance(value, int)
+        elif mode == 2:
+            return f'rb + {value}', False
+        else:
+            raise ValueError(f'Unsupported parameter_mode {mode} for writing')
+
+    def _operand(self, address: int) -> Union[int, str]:
+        """ operand value inlined as constant, or read at runtime when the program modifies it """
+        if address in self._state.volatile:
+            return f'read({address})'
+        return self._state._read(address)
+
+    def _exit(self, next_ip: int, status: str = 'None') -> List[str]:
+        return [
+            f'state._instruction_pointer = {next_ip}',
+            'state._relative_base = rb',
+            f'return {status}',
+        ]
+
+
+class JitIntcodeComputer(IntcodeComputer):
+    """ IntcodeComputer that compiles hot basic blocks into Python functions
+
+    Blocks run straight-line code up to a jump or output instruction, halt is always
+    handled by the interpreter. Writes into compiled code drop the affected blocks,
+    execution then continues in the interpreter until the code gets hot again. Blocks
+    compiled from unmodified code also go to the initial state, so machines started by
+    reset() do not compile them again, and reset() keeps the visit counts of the run, so
+    code gets hot over many short runs too (the queries of day 19).
+    """
+
+    state_class = JitState
+
+    def reset(self):
+        if hasattr(self, '_state'):
+            self._carry_visits()
+        super().reset()
+
+    def _carry_visits(self):
+        """ visit counts of the current run become those every run after reset() starts with """
+        initial = self._initial_state
+        for address, count in self._state.visits.items():
+            if address in initial.blocks:
+                continue
+            if count < HOT_THRESHOLD:
+                initial.visits[address] = count
+            else:
+                # compiled from modified code, or not compilable: it gets hot again, and tried again
+                initial.visits.pop(address, None)
+
+    def run(self, output_limit: Optional[int] = None, max_instructions: Optional[int] = None) -> Status:
+        if max_instructions is not None:
+            return self._run_slice(output_limit, max_instructions)
+
+        state = self._state
+        blocks = state.blocks
+        visits = state.visits
+        target = None if output_limit is None else len(state.outputs) + output_limit
+        while True:
+            ip = state._instruction_pointer
+            block = blocks.get(ip)
+            if block is not None:
+                status = block(state)
+                if status is not None:
+                    if status is not Status.OUTPUT:
+                        return status
+                    if target is not None and len(state.outputs) >= target:
+                        return status
+                continue
+
+            count = visits.get(ip, 0) + 1
+            visits[ip] = count
+            if count == HOT_THRESHOLD and self._compile(ip):
+                continue
+
+            status = state.opcode().instruction.execute(state)
+            if status is not None:
+                if status is not Status.OUTPUT:
+                    return status
+                if target is not None and len(state.outputs) >= target:
+                    return status
+
+    def _run_slice(self, output_limit: Optional[int], max_instructions: int) -> Status:
+        """ run() with an instruction budget, a compiled block may overrun it by its size """
+        state = self._state
+        blocks = state.blocks
+        visits = state.visits
+        target = None if output_limit is None else len(state.outputs) + output_limit
+        budget = max_instructions
+        while budget > 0:
+            ip = state._instruction_pointer
+            block = blocks.get(ip)
+            if block is not None:
+                budget -= block.size
+                status = block(state)
+            else:
+                count = visits.get(ip, 0) + 1
+                visits[ip] = count
+                if count == HOT_THRESHOLD and self._compile(ip):
+                    continue
+                budget -= 1
+                status = state.opcode().instruction.execute(state)
+
+            if status is not None:
+                if status is not Status.OUTPUT:
+                    return status
+                if target is not None and len(state.outputs) >= target:
+                    return status
+        return Status.YIELDED
+
+    def _compile(self, start: int) -> bool:
+        compiled = BlockCompiler(self._state).compile(start)
+        if compiled is None:
+            return False
+
+        cells, block = compiled
+        state = self._state
+        state.register_block(start, cells, block)
+
+        initial = self._initial_state
+        if (initial is not state and start not in initial.blocks
+                and all(initial._read(cell) == state._read(cell) for cell in cells)):
+            # compiled from the code as loaded, valid for every machine reset() starts
+            initial.register_block(start, cells, block)
+        return True
@@ -0,0 +1,157 @@
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from intcode_image import load_image
+
+# memory cells available above the program image, for relative base stacks and scratch data
+DEFAULT_HEADROOM = 4096
+
+
+class LockstepState:
+    """ Memory, instruction pointers and I/O of all instances, one row per instance """
+
+    def __init__(self, program: np.ndarray, memory_size: int, inputs: np.ndarray):
+        count = len(inputs)
+        self.memory = np.zeros((count, memory_size), dtype=np.int64)
+        self.memory[:, :len(program)] = program
+        self.instruction_pointer = np.zeros(count, dtype=np.int64)
+        self.relative_base = np.zeros(count, dtype=np.int64)
+        self.running = np.ones(count, dtype=bool)
+
+        self.inputs = inputs
+        self.input_pointer = np.zeros(count, dtype=np.int64)
+        self.outputs = np.zeros((count, 4), dtype=np.int64)
+        self.output_count = np.zeros(count, dtype=np.int64)
+
+    def read_parameter(self, lanes: np.ndarray, address: int, index: int, mode: int) -> np.ndarray:
+        """ parameter index of the instruction at address, for every lane """
+        value = self.memory[lanes, address + index + 1]
+        if mode == 0:
+            return self.memory[lanes, self._checked(value)]
+        elif mode == 1:
+            return value
+        elif mode == 2:
+            return self.memory[lanes, self._checked(self.relative_base[lanes] + value)]
+        else:
+            raise ValueError(f'Unsupported parameter_mode {mode} for reading')
+
+    def write_parameter(self, lanes: np.ndarray, address: int, index: int, mode: int, value: np.ndarray):
+        target = self.memory[lanes, address + index + 1]
+        if mode == 0:
+            self.memory[lanes, self._checked(target)] = value
+        elif mode == 2:
+            self.memory[lanes, self._checked(self.relative_base[lanes] + target)] = value
+        else:
+            raise ValueError(f'Unsupported parameter_mode {mode} for writing')
+
+    def read_input(self, lanes: np.ndarray) -> np.ndarray:
+        pointers = self.input_pointer[lanes]
+        if (pointers >= self.inputs.shape[1]).any():
+            raise ValueError('Program needs more input than given')
+        self.input_pointer[lanes] += 1
+        return self.inputs[lanes, pointers]
+
+    def write_output(self, lanes: np.ndarray, value: np.ndarray):
+        counts = self.output_count[lanes]
+        if counts.max() >= self.outputs.shape[1]:
+            self.outputs = np.concatenate([self.outputs, np.zeros_like(self.outputs)], axis=1)
+        self.outputs[lanes, counts] = value
+        self.output_count[lanes] += 1
+
+    def results(self) -> List[List[int]]:
+        return [row[:count].tolist() for row, count in zip(self.outputs, self.output_count)]
+
+    def _checked(self, addresses: np.ndarray) -> np.ndarray:
+        # numpy would silently wrap negative addresses
+        if addresses.min() < 0 or addresses.max() >= self.memory.shape[1]:
+            raise IndexError(
+                f'Memory address outside 0..{self.memory.shape[1] - 1}, increase memory_size')
+        return addresses
+
+
+class LockstepComputer:
+    """ Runs many instances of one program at once, SIMD style
+
+    Each step picks the lowest instruction pointer among the running instances and executes
+    that instruction for every instance sitting there, so instances reconverge after their
+    control flow diverged. Values are int64: results match IntcodeComputer only for programs
+    that stay clear of bigints, and memory is limited to memory_size cells per instance.
+    """
+
+    def __init__(self, program: Union[List[int], str], memory_size: int = None):
+        if isinstance(program, str):
+            program = load_image(program)
+
+        self._program = np.array(program, dtype=np.int64)
+        self.memory_size = memory_size or len(program) + DEFAULT_HEADROOM
+
+    def run(self, input_vectors: Sequence[Sequence[int]]) -> List[List[int]]:
+        """ runs one instance per input vector until all have halted, returns their outputs """
+        return self.execute(input_vectors).results()
+
+    def execute(self, input_vectors: Sequence[Sequence[int]], patches: Dict[int, Sequence[int]] = None) -> LockstepState:
+        """ runs one instance per input vector, patches sets a memory cell to a value per instance
+
+        The final state is returned, so results left in memory (like in day 2) can be read.
+        """
+        if len(input_vectors) == 0:
+            # reshape cannot infer the width of no rows
+            inputs = np.zeros((0, 0), dtype=np.int64)
+        else:
+            inputs = np.array(input_vectors, dtype=np.int64).reshape(len(input_vectors), -1)
+        state = LockstepState(self._program, self.memory_size, inputs)
+        for address, values in (patches or {}).items():
+            state.memory[:, address] = values
+
+        while state.running.any():
+            running = np.flatnonzero(state.running)
+            pointers = state.instruction_pointer[running]
+            address = int(pointers.min())
+            lanes = running[pointers == address]
+
+            instructions = state.memory[lanes, address]
+            if (instructions == instructions[0]).all():
+                self._step(state, lanes, address, int(instructions[0]))
+            else:
+                # self-modifying code gave the instances different instructions here
+                for instruction in np.unique(instructions):
+                    self._step(state, lanes[instructions == instruction], address, int(instruction))
+
+        return state
+
+    def _step(self, state: LockstepState, lanes: np.ndarray, address: int, instruction: int):
+        opcode = instruction % 100
+        modes = (instruction // 100 % 10, instruction // 1000 % 10, instruction // 10000 % 10)
+
+        if opcode in (1, 2, 7, 8):
+            a = state.read_parameter(lanes, address, 0, modes[0])
+            b = state.read_parameter(lanes, address, 1, modes[1])
+            if opcode == 1:
+                result = a + b
+            elif opcode == 2:
+                result = a * b
+            elif opcode == 7:
+                result = (a < b).astype(np.int64)
+            else:
+                result = (a == b).astype(np.int64)
+            state.write_parameter(lanes, address, 2, modes[2], result)
+            state.instruction_pointer[lanes] = address + 4
+        elif opcode == 3:
+            state.write_parameter(lanes, address, 0, modes[0], state.read_input(lanes))
+            state.instruction_pointer[lanes] = address + 2
+        elif opcode == 4:
+            state.write_output(lanes, state.read_parameter(lanes, address, 0, modes[0]))
+            state.instruction_pointer[lanes] = address + 2
+        elif opcode in (5, 6):
+            value = state.read_parameter(lanes, address, 0, modes[0])
+            target = state.read_parameter(lanes, address, 1, modes[1])
+            jump = (value != 0) if opcode == 5 else (value == 0)
+            state.instruction_pointer[lanes] = np.where(jump, target, address + 3)
+        elif opcode == 9:
+            state.relative_base[lanes] += state.read_parameter(lanes, address, 0, modes[0])
+            state.instruction_pointer[lanes] = address + 2
+        elif opcode == 99:
+            state.running[lanes] = False
+        else:
+            raise ValueError(f'Unknown opcode {opcode} at address {address}')
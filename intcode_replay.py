@@ -0,0 +1,171 @@
+""" Recording of the I/O of a machine, and replay of it without the controller
+
+Intcode is deterministic in the sequence of its inputs, so a replay can queue every recorded
+input up front and run at full engine speed, whatever controller (curses, asyncio, a cluster)
+produced them. The instruction count of every event shows where a replay diverges.
+
+    python intcode_replay.py day13.txt game.log --patch 0=2        # replay and time a game
+    python intcode_replay.py day13.txt game.log --patch 0=2 --jit
+"""
+import argparse
+import struct
+import time
+from typing import List, NamedTuple, Optional, Type
+
+from intcode import IntcodeComputer, Status, program_hash
+from intcode_image import load_image
+from intcode_jit import JitIntcodeComputer
+
+# magic, program hash, number of events, instructions executed
+HEADER = struct.Struct('<4s4x64sqq')
+MAGIC = b'ICR1'
+
+# kind, instruction count, value; BIGINT kinds are followed by the value as text
+EVENT = struct.Struct('<Bqq')
+INPUT = 0
+OUTPUT = 1
+BIGINT = 2
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class Event(NamedTuple):
+    kind: int  # INPUT or OUTPUT
+    instruction: int  # instructions executed before this one
+    value: int
+
+
+class ReplayMismatch(ValueError):
+    """ a replay produced different output than the recording """
+
+
+class Recording:
+    """ Inputs consumed and outputs produced by a machine, in order """
+
+    def __init__(self, program: str):
+        self.program = program  # program_hash of the recorded program
+        self.events: List[Event] = []
+        self.instructions = 0
+
+    def inputs(self) -> List[int]:
+        return [event.value for event in self.events if event.kind == INPUT]
+
+    def outputs(self) -> List[int]:
+        return [event.value for event in self.events if event.kind == OUTPUT]
+
+    def save(self, path: str):
+        with open(path, 'wb') as output:
+            output.write(HEADER.pack(MAGIC, self.program.encode(), len(self.events), self.instructions))
+            for kind, instruction, value in self.events:
+                if INT64_MIN <= value <= INT64_MAX:
+                    output.write(EVENT.pack(kind, instruction, value))
+                else:
+                    text = str(value).encode()
+                    output.write(EVENT.pack(kind | BIGINT, instruction, len(text)))
+                    output.write(text)
+
+    @classmethod
+    def load(cls, path: str) -> 'Recording':
+        with open(path, 'rb') as source:
+            data = source.read()
+        magic, program, count, instructions = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not an Intcode recording')
+
+        recording = cls(program.decode())
+        recording.instructions = instructions
+        offset = HEADER.size
+        for _ in range(count):
+            kind, instruction, value = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            if kind & BIGINT:
+                kind &= ~BIGINT
+                value, offset = int(data[offset:offset + value]), offset + value
+            recording.events.append(Event(kind, instruction, value))
+        return recording
+
+
+def record(computer: IntcodeComputer) -> Recording:
+    """ swaps in an interpreter loop that logs the I/O of computer, until stop_recording() """
+    recording = Recording(program_hash(computer._program))
+    events = recording.events
+
+    def run(output_limit: Optional[int] = None, max_instructions: Optional[int] = None) -> Status:
+        state = computer._state
+        target = None if output_limit is None else len(state.outputs) + output_limit
+        budget = float('inf') if max_instructions is None else max_instructions
+        executed = recording.instructions
+        try:
+            while budget > 0:
+                budget -= 1
+                opcode = state.opcode()
+                value = state.inputs[0] if opcode.opcode == 3 and state.inputs else None
+                status = opcode.instruction.execute(state)
+                if status is Status.NEEDS_INPUT:
+                    return status
+
+                if value is not None:
+                    events.append(Event(INPUT, executed, value))
+                elif status is Status.OUTPUT:
+                    events.append(Event(OUTPUT, executed, state.outputs[-1]))
+                executed += 1
+                if status is not None:
+                    if status is Status.OUTPUT:
+                        if target is None or len(state.outputs) < target:
+                            continue
+                    return status
+            return Status.YIELDED
+        finally:
+            recording.instructions = executed
+
+    computer.run = run
+    return recording
+
+
+def stop_recording(computer: IntcodeComputer):
+    computer.__dict__.pop('run', None)
+
+
+def replay(recording: Recording, computer: IntcodeComputer) -> Status:
+    """ runs computer on the recorded inputs, raises ReplayMismatch when its outputs differ """
+    if recording.program != program_hash(computer._program):
+        raise ValueError('Recording is of a different program')
+
+    computer.send(*recording.inputs())
+    status = computer.run()
+    outputs = computer.take_outputs()
+
+    expected = [event for event in recording.events if event.kind == OUTPUT]
+    for index, (value, event) in enumerate(zip(outputs, expected)):
+        if value != event.value:
+            raise ReplayMismatch(
+                f'Output {index} is {value}, recorded {event.value} after {event.instruction} instructions')
+    if len(outputs) != len(expected):
+        raise ReplayMismatch(f'Replay produced {len(outputs)} outputs, recorded {len(expected)}')
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded Intcode run')
+    parser.add_argument('program', help='program file in input/')
+    parser.add_argument('recording', help='recording made with intcode_replay.record()')
+    parser.add_argument('--patch', metavar='ADDRESS=VALUE', action='append', default=[],
+                        help='memory to change before running, like 0=2 for the games')
+    parser.add_argument('--jit', action='store_true', help='use JitIntcodeComputer')
+    args = parser.parse_args()
+
+    program = list(load_image(args.program))
+    for patch in args.patch:
+        address, value = map(int, patch.split('='))
+        program[address] = value
+
+    computer_class: Type[IntcodeComputer] = JitIntcodeComputer if args.jit else IntcodeComputer
+    recording = Recording.load(args.recording)
+    start = time.perf_counter()
+    status = replay(recording, computer_class(program))
+    seconds = time.perf_counter() - start
+    print(f'{status.value}: {recording.instructions} instructions, {len(recording.events)} events '
+          f'in {seconds:.3f}s ({recording.instructions / seconds:,.0f} instr/s)')
+
+
+if __name__ == '__main__':
+    main()
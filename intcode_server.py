@@ -0,0 +1,265 @@
+""" Local query server keeping warm machines for one program, and a client for it
+
+Tools probing the same program (the tractor beam of day 19) connect to one server instead of
+each loading and parsing the program themselves. The protocol is a JSON object per
+line: a request {"id": 1, "inputs": [[0, 0], [0, 1]]} holds a batch of input vectors, the
+response {"id": 1, "outputs": [[1], [0]]} (or {"id": 1, "error": "..."}) the outputs of each.
+Clients may send requests without waiting for responses, a connection answers them in order.
+
+    python intcode_server.py day19.txt --socket /tmp/day19.sock
+    python intcode_server.py day19.txt --port 8019 --jit
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+from typing import Dict, List, Optional, Sequence, Type, Union
+
+from intcode import EXECUTE_SLICE, IntcodeComputer, Status
+from intcode_image import load_image
+from intcode_jit import JitIntcodeComputer
+
+LOG = logging.getLogger(__name__)
+
+# longest request or response line, a batch of a few hundred thousand probes fits
+LINE_LIMIT = 1 << 24
+# input vectors a batch runs before other connections get a turn
+SLICE = 64
+# instructions a single run may take, a program looping forever on some input gets an error
+MAX_INSTRUCTIONS = 100_000_000
+
+
+class QueryServer:
+    """ Answers batches of queries with a pool of machines forked from one warm machine
+
+    The program is loaded and parsed once, every machine of the pool is forked from that
+    machine and shares its memory copy-on-write. A machine is taken from the pool for the whole batch of a request.
+    Long runs yield to other connections every EXECUTE_SLICE instructions, and fail after
+    max_instructions (None runs without a limit).
+    """
+
+    def __init__(self, program: Union[Sequence[int], str], pool_size: int = 4,
+                 computer_class: Type[IntcodeComputer] = IntcodeComputer,
+                 max_instructions: Optional[int] = MAX_INSTRUCTIONS):
+        if isinstance(program, str):
+            program = load_image(program)
+
+        self.max_instructions = max_instructions
+
+        template = computer_class(program)
+        self._pool: asyncio.Queue = asyncio.Queue()
+        for _ in range(pool_size):
+            self._pool.put_nowait(template.fork())
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, path: str = None, host: str = '127.0.0.1', port: int = 0):
+        """ listens on the Unix socket path, or on host and port (0 picks a free port) """
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path, limit=LINE_LIMIT)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, limit=LINE_LIMIT)
+
+    @property
+    def address(self):
+        """ socket path or (host, port) the server listens on """
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def run_batch(self, input_vectors: Sequence[Sequence[int]]) -> List[List[int]]:
+        """ outputs of the program for every input vector, on a machine of the pool """
+        computer = await self._pool.get()
+        try:
+            outputs = []
+            for start in range(0, len(input_vectors), SLICE):
+                for inputs in input_vectors[start:start + SLICE]:
+                    outputs.append(await self._run(computer, inputs))
+                await asyncio.sleep(0)
+            return outputs
+        finally:
+            self._pool.put_nowait(computer)
+
+    async def _run(self, computer: IntcodeComputer, inputs: Sequence[int]) -> List[int]:
+        """ outputs of a fresh run on inputs, in slices of EXECUTE_SLICE instructions """
+        computer.reset()
+        computer.send(*inputs)
+        executed = 0
+        while (status := computer.run(max_instructions=EXECUTE_SLICE)) is Status.YIELDED:
+            executed += EXECUTE_SLICE
+            if self.max_instructions is not None and executed >= self.max_instructions:
+                raise ValueError(f'Program did not finish within {self.max_instructions} instructions on {list(inputs)}')
+            await asyncio.sleep(0)
+        if status is Status.NEEDS_INPUT:
+            raise ValueError(f'Program needs more input than {list(inputs)}')
+        return computer.take_outputs()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                request_id = request['id']
+                try:
+                    response = {'id': request_id, 'outputs': await self.run_batch(_input_vectors(request))}
+                except ValueError as e:
+                    response = {'id': request_id, 'error': str(e)}
+                except Exception as e:
+                    # the program failing on the inputs (an unknown opcode, a negative address)
+                    # fails this request, not the connection
+                    response = {'id': request_id, 'error': f'{type(e).__name__}: {e}'}
+                writer.write(json.dumps(response, separators=(',', ':')).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, ValueError, KeyError, TypeError) as e:
+            # broken JSON, or a line that is no request with an id
+            LOG.warning('Dropping client: %r', e)
+        finally:
+            writer.close()
+
+
+def _input_vectors(request: Dict) -> List[List[int]]:
+    """ the inputs of a request, checked to be a list of integer lists """
+    input_vectors = request.get('inputs')
+    if not isinstance(input_vectors, list) or not all(
+            isinstance(inputs, list) and all(type(value) is int for value in inputs) for inputs in input_vectors):
+        raise ValueError('Request inputs must be a list of lists of integers')
+    return input_vectors
+
+
+class _Connection:
+    """ one connection of a QueryClient, responses are matched to requests by id """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writer = writer
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._receiver = asyncio.ensure_future(self._receive(reader))
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def closed(self) -> bool:
+        return self._receiver.done()
+
+    async def request(self, input_vectors: Sequence[Sequence[int]]) -> List[List[int]]:
+        if self.closed:
+            raise ConnectionError('Connection to the query server is closed')
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            self._writer.write(json.dumps({'id': request_id, 'inputs': input_vectors}, separators=(',', ':')).encode() + b'\n')
+            await self._writer.drain()
+            return await future
+        except asyncio.CancelledError:
+            # the response of a cancelled request, like one timed out by asyncio.wait_for, is dropped
+            self._pending.pop(request_id, None)
+            raise
+
+    async def close(self):
+        self._writer.close()
+        await self._receiver
+
+    async def _receive(self, reader: asyncio.StreamReader):
+        try:
+            while line := await reader.readline():
+                response = json.loads(line)
+                future = self._pending.pop(response['id'], None)
+                if future is None or future.done():
+                    continue
+                if 'error' in response:
+                    future.set_exception(ValueError(response['error']))
+                else:
+                    future.set_result(response['outputs'])
+        except ConnectionError:
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('Query server closed the connection'))
+            self._pending.clear()
+
+
+class QueryClient:
+    """ Client of a QueryServer keeping up to connections open, requests go to the least busy one
+
+    Requests are pipelined: many coroutines can query at once over the same connections.
+    """
+
+    def __init__(self, path: str = None, host: str = '127.0.0.1', port: int = None, connections: int = 4):
+        if path is None and port is None:
+            raise ValueError('QueryClient needs a socket path or a port')
+        self.path = path
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self._connections: List[_Connection] = []
+        self._opening = asyncio.Lock()
+
+    async def __aenter__(self) -> 'QueryClient':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def query(self, *inputs: int) -> List[int]:
+        """ outputs of one run of the program on inputs """
+        (outputs,) = await self.query_batch([inputs])
+        return outputs
+
+    async def query_batch(self, input_vectors: Sequence[Sequence[int]]) -> List[List[int]]:
+        """ outputs of one run of the program for every input vector, in order """
+        return await (await self._connection()).request([list(inputs) for inputs in input_vectors])
+
+    async def close(self):
+        connections, self._connections = self._connections, []
+        for connection in connections:
+            await connection.close()
+
+    async def _connection(self) -> _Connection:
+        # one connection is opened at a time, so concurrent queries do not all open their own
+        async with self._opening:
+            self._connections = [connection for connection in self._connections if not connection.closed]
+            idle = min(self._connections, key=lambda connection: connection.pending, default=None)
+            if idle is not None and (idle.pending == 0 or len(self._connections) >= self.connections):
+                return idle
+
+            if self.path is not None:
+                streams = await asyncio.open_unix_connection(self.path, limit=LINE_LIMIT)
+            else:
+                streams = await asyncio.open_connection(self.host, self.port, limit=LINE_LIMIT)
+            connection = _Connection(*streams)
+            self._connections.append(connection)
+            return connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve queries on an Intcode program')
+    parser.add_argument('program', help='program file in input/')
+    parser.add_argument('--socket', help='Unix socket to listen on')
+    parser.add_argument('--port', type=int, default=0, help='localhost port to listen on, when no socket is given')
+    parser.add_argument('--pool', type=int, default=4, help='number of warm machines')
+    parser.add_argument('--jit', action='store_true', help='use JitIntcodeComputer')
+    parser.add_argument('--max-instructions', type=int, default=MAX_INSTRUCTIONS,
+                        help='instructions a run may take before its request fails')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def serve():
+        server = QueryServer(args.program, args.pool, JitIntcodeComputer if args.jit else IntcodeComputer,
+                             max_instructions=args.max_instructions)
+        await server.start(args.socket, port=args.port)
+        LOG.info('Serving %s on %s', args.program, server.address)
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+from array import array
+from multiprocessing import shared_memory
+from typing import Sequence
+
+from intcode import PAGE_SIZE, CompactMemory
+
+
+class SharedImage:
+    """ Program image in shared memory, mapped without copying by every process using it
+
+    The cells are padded with zeros to whole pages, so machines share the last page too.
+    Pickling sends only the name of the segment, so a SharedImage can be handed to worker
+    processes directly. The creating process owns the segment and unlinks it in close().
+    """
+
+    def __init__(self, program: Sequence[int]):
+        try:
+            data = array('q', program).tobytes()
+        except OverflowError:
+            raise ValueError('Shared images need cells that fit in int64') from None
+        self.length = len(program)
+        self._memory = shared_memory.SharedMemory(create=True, size=_padded(self.length) * 8)
+        self._memory.buf[:len(data)] = data
+        self._owner = True
+        self.cells = self._memory.buf[:_padded(self.length) * 8].cast('q')
+
+    @classmethod
+    def attach(cls, name: str, length: int) -> 'SharedImage':
+        """ maps the image created by another process """
+        image = cls.__new__(cls)
+        image._memory = shared_memory.SharedMemory(name=name)
+        image._owner = False
+        image.length = length
+        image.cells = image._memory.buf[:_padded(length) * 8].cast('q')
+        return image
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def __reduce__(self):
+        return SharedImage.attach, (self.name, self.length)
+
+    def __enter__(self) -> 'SharedImage':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ unmaps the segment, machines using the image must be gone by now """
+        self.cells.release()
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+class OverlayMemory(CompactMemory):
+    """ Memory reading a shared image page by page, only pages written to become private
+
+    Machines get it with IntcodeComputer(image.cells, memory_class=OverlayMemory).
+    """
+
+    def __init__(self, program: Sequence[int]):
+        super().__init__(())
+        full_pages = len(program) // PAGE_SIZE
+        for number in range(full_pages):
+            self._pages[number] = program[number * PAGE_SIZE:(number + 1) * PAGE_SIZE]
+            self._shared_pages.add(number)
+
+        tail = program[full_pages * PAGE_SIZE:]
+        if len(tail):
+            page = array('q', tail)
+            page.frombytes(bytes(8 * (PAGE_SIZE - len(tail))))
+            self._pages[full_pages] = page
+
+
+def _padded(length: int) -> int:
+    return max(PAGE_SIZE, -(-length // PAGE_SIZE) * PAGE_SIZE)
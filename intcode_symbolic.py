@@ -0,0 +1,294 @@
+""" Symbolic execution of straight-line Intcode, to solve input searches without running them
+
+Selected memory cells become variables, add and multiply build polynomials over them, so a
+program like the gravity assist of day 2 reduces to one expression for the output cell.
+solve() finds values for the variables giving a target, find_inputs() falls back to running
+every combination when the program does something symbolic execution cannot follow.
+"""
+import itertools
+import logging
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from intcode import IntcodeComputer, Status
+
+LOG = logging.getLogger(__name__)
+
+# instructions a run may take, symbolic or concrete, a program looping on some input gives up
+MAX_INSTRUCTIONS = 1000000
+
+Monomial = Tuple[str, ...]  # sorted variable names, repeated for powers
+Value = Union[int, 'Expression', 'Unknown']
+
+
+class SymbolicFailure(ValueError):
+    """ the program depends on a variable in a way an expression cannot describe """
+
+
+class Unknown:
+    """ Value read through an address that depends on a variable, any use of it fails
+
+    Day 2 does this in its first instruction, the result is overwritten before it is used.
+    """
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+    def __add__(self, other: Value) -> 'Unknown':
+        return self
+
+    __radd__ = __mul__ = __rmul__ = __add__
+
+    def __repr__(self) -> str:
+        return f'Unknown({self.reason})'
+
+
+class Expression:
+    """ Polynomial with integer coefficients over named variables """
+
+    def __init__(self, terms: Mapping[Monomial, int]):
+        self.terms: Dict[Monomial, int] = {monomial: c for monomial, c in terms.items() if c != 0}
+
+    @classmethod
+    def variable(cls, name: str) -> 'Expression':
+        return cls({(name,): 1})
+
+    @property
+    def variables(self) -> List[str]:
+        return sorted({name for monomial in self.terms for name in monomial})
+
+    @property
+    def degree(self) -> int:
+        return max((len(monomial) for monomial in self.terms), default=0)
+
+    def evaluate(self, values: Mapping[str, int]) -> int:
+        total = 0
+        for monomial, coefficient in self.terms.items():
+            for name in monomial:
+                coefficient *= values[name]
+            total += coefficient
+        return total
+
+    def split(self, name: str) -> Optional[Tuple['Expression', 'Expression']]:
+        """ (a, b) with self == a * name + b, None when name appears in a higher power """
+        a, b = {}, {}
+        for monomial, coefficient in self.terms.items():
+            count = monomial.count(name)
+            if count > 1:
+                return None
+            if count:
+                rest = list(monomial)
+                rest.remove(name)
+                a[tuple(rest)] = coefficient
+            else:
+                b[monomial] = coefficient
+        return Expression(a), Expression(b)
+
+    def __add__(self, other: Value) -> 'Expression':
+        if isinstance(other, Unknown):
+            return NotImplemented
+        terms = dict(self.terms)
+        for monomial, coefficient in _terms(other).items():
+            terms[monomial] = terms.get(monomial, 0) + coefficient
+        return Expression(terms)
+
+    __radd__ = __add__
+
+    def __mul__(self, other: Value) -> 'Expression':
+        if isinstance(other, Unknown):
+            return NotImplemented
+        terms: Dict[Monomial, int] = {}
+        for (left, a), (right, b) in itertools.product(self.terms.items(), _terms(other).items()):
+            monomial = tuple(sorted(left + right))
+            terms[monomial] = terms.get(monomial, 0) + a * b
+        return Expression(terms)
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, (int, Expression)) and self.terms == _terms(other)
+
+    def __repr__(self) -> str:
+        if not self.terms:
+            return '0'
+        parts = []
+        for monomial, coefficient in sorted(self.terms.items(), key=lambda term: (-len(term[0]), term[0])):
+            factors = ([] if coefficient == 1 and monomial else [str(coefficient)]) + list(monomial)
+            parts.append('*'.join(factors))
+        return ' + '.join(parts)
+
+
+def _terms(value: Value) -> Dict[Monomial, int]:
+    return value.terms if isinstance(value, Expression) else {(): value}
+
+
+def _simplify(value: Value) -> Value:
+    """ constant expressions become plain ints again """
+    if isinstance(value, Expression) and not value.variables:
+        return value.terms.get((), 0)
+    return value
+
+
+def _concrete(value: Value, what: str, address: int) -> int:
+    if isinstance(value, Expression):
+        raise SymbolicFailure(f'{what} of the instruction at {address} depends on {", ".join(value.variables)}')
+    if isinstance(value, Unknown):
+        raise SymbolicFailure(f'{what} of the instruction at {address} is {value.reason}')
+    return value
+
+
+def _address(value: Value, what: str, address: int) -> int:
+    """ a concrete address, a list index would wrap negative ones to the end of memory """
+    concrete = _concrete(value, what, address)
+    if concrete < 0:
+        raise SymbolicFailure(f'{what} of the instruction at {address} is negative: {concrete}')
+    return concrete
+
+
+def execute(program: Sequence[int], variables: Mapping[int, str], max_instructions: int = MAX_INSTRUCTIONS) -> List[Value]:
+    """ runs program with the cells of variables (address -> name) symbolic, returns memory
+
+    Supports add, multiply and halt, and jumps and comparisons on concrete values, in
+    position and immediate mode. Anything else raises SymbolicFailure, values read through
+    a symbolic address are Unknown.
+    """
+    memory: List[Value] = list(program)
+    for address, name in variables.items():
+        if address >= len(memory):
+            memory.extend([0] * (address + 1 - len(memory)))
+        memory[address] = Expression.variable(name)
+
+    def read(address: int) -> Value:
+        # like the interpreter, memory past the program reads as 0
+        return memory[address] if address < len(memory) else 0
+
+    def parameter(index: int) -> Value:
+        operand = read(ip + index)
+        mode = instruction // (10 ** (index + 1)) % 10
+        if mode == 1:
+            return operand
+        if mode != 0:
+            raise SymbolicFailure(f'Parameter mode {mode} at {ip} is not supported')
+        if isinstance(operand, Expression):
+            return Unknown(f'read through an address depending on {", ".join(operand.variables)} at {ip}')
+        return read(_address(operand, 'Address', ip))
+
+    def store(index: int, value: Value):
+        mode = instruction // (10 ** (index + 1)) % 10
+        if mode != 0:
+            raise SymbolicFailure(f'Parameter mode {mode} at {ip} is not supported for writing')
+        address = _address(read(ip + index), 'Target', ip)
+        if address >= len(memory):
+            memory.extend([0] * (address + 1 - len(memory)))
+        memory[address] = _simplify(value)
+
+    ip = 0
+    for _ in range(max_instructions):
+        instruction = _concrete(read(ip), 'Opcode', ip)
+        opcode = instruction % 100
+        if opcode == 99:
+            return memory
+        elif opcode == 1:
+            store(3, parameter(1) + parameter(2))
+            ip += 4
+        elif opcode == 2:
+            store(3, parameter(1) * parameter(2))
+            ip += 4
+        elif opcode in (5, 6):
+            condition = _concrete(parameter(1), 'Condition', ip)
+            if (condition != 0) == (opcode == 5):
+                ip = _address(parameter(2), 'Jump target', ip)
+            else:
+                ip += 3
+        elif opcode in (7, 8):
+            a = _concrete(parameter(1), 'Comparison', ip)
+            b = _concrete(parameter(2), 'Comparison', ip)
+            store(3, int(a < b if opcode == 7 else a == b))
+            ip += 4
+        else:
+            raise SymbolicFailure(f'Opcode {opcode} at {ip} is not supported')
+    raise SymbolicFailure(f'Program did not halt within {max_instructions} instructions')
+
+
+def solve(expression: Value, target: int, domains: Mapping[str, Sequence[int]]) -> Optional[Dict[str, int]]:
+    """ values from domains for which expression equals target, None when there are none
+
+    With a variable appearing only linearly, the others are enumerated and that one is
+    solved for; otherwise every combination is evaluated, which is still no machine run.
+    """
+    expression = expression if isinstance(expression, Expression) else Expression({(): expression})
+    names = list(domains)
+    solved = next((name for name in expression.variables if expression.split(name) is not None), None)
+
+    if solved is None:
+        for values in itertools.product(*domains.values()):
+            assignment = dict(zip(names, values))
+            if expression.evaluate(assignment) == target:
+                return assignment
+        return None
+
+    a, b = expression.split(solved)
+    others = [name for name in names if name != solved]
+    # variables the expression does not mention can take any value of their domain
+    used = set(expression.variables)
+    for values in itertools.product(*(domains[name] if name in used else domains[name][:1] for name in others)):
+        assignment = dict(zip(others, values))
+        factor, rest = a.evaluate(assignment), b.evaluate(assignment)
+        if factor == 0:
+            if rest == target:
+                assignment[solved] = domains[solved][0]
+                return {name: assignment[name] for name in names}
+        elif (target - rest) % factor == 0 and (target - rest) // factor in domains[solved]:
+            assignment[solved] = (target - rest) // factor
+            return {name: assignment[name] for name in names}
+    return None
+
+
+def search(program: Sequence[int], variables: Mapping[int, str], target: int,
+           domains: Mapping[str, Sequence[int]], output: int = 0,
+           max_instructions: int = MAX_INSTRUCTIONS) -> Optional[Dict[str, int]]:
+    """ runs program for every combination of the domains until memory[output] equals target
+
+    Combinations the program fails on (an invalid opcode, a negative address), waits for input
+    on or does not halt on within max_instructions are skipped.
+    """
+    names = list(domains)
+    by_name = {name: address for address, name in variables.items()}
+    for values in itertools.product(*domains.values()):
+        patched = list(program) + [0] * (max(variables, default=-1) + 1 - len(program))
+        for name, value in zip(names, values):
+            patched[by_name[name]] = value
+        computer = IntcodeComputer(patched)
+        try:
+            status = computer.run(max_instructions=max_instructions)
+        except (KeyError, IndexError, ValueError) as e:
+            LOG.debug('Program fails on %r: %r', values, e)
+            continue
+        if status is not Status.HALTED:
+            LOG.debug('Program stops with %s on %r', status.name, values)
+            continue
+        if computer._state._read(output) == target:
+            return dict(zip(names, values))
+    return None
+
+
+def _concrete_output(memory: List[Value], output: int) -> Union[int, Expression]:
+    value = memory[output] if output < len(memory) else 0
+    if isinstance(value, Unknown):
+        raise SymbolicFailure(f'Output is {value.reason}')
+    return value
+
+
+def find_inputs(program: Sequence[int], variables: Mapping[int, str], target: int,
+                domains: Mapping[str, Sequence[int]], output: int = 0) -> Optional[Dict[str, int]]:
+    """ values for the variable cells making memory[output] equal target after a run
+
+    Solves symbolically when it can, and searches by running the program when it cannot.
+    """
+    try:
+        expression = _concrete_output(execute(program, variables), output)
+    except SymbolicFailure as e:
+        LOG.info('Symbolic execution failed, searching concretely: %s', e)
+        return search(program, variables, target, domains, output)
+
+    LOG.debug('memory[%d] = %r', output, expression)
+    return solve(expression, target, domains)
@@ -0,0 +1,195 @@
+""" Synthetic Intcode programs for scaling benchmarks, each with its expected outputs
+
+Every generator stresses one part of the engine and takes the size of the program image,
+padded with data cells, so memory size can be varied apart from the amount of work:
+
+    arithmetic      tight add/multiply/compare loop, measures dispatch cost
+    memory          relative base walk reading and writing every data cell, memory traffic
+    io              one input and one output per iteration, I/O overhead
+    selfmodifying   loop patching its own operand and rewriting its own instruction
+
+    python intcode_workload.py memory 1000000 --size 10000000 --output input/memory.txt
+"""
+import argparse
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple, Union
+
+from utils import input_path
+
+POSITION, IMMEDIATE, RELATIVE = 0, 1, 2
+
+Parameter = Tuple[int, Union[int, str]]
+
+
+def pos(address: Union[int, str]) -> Parameter:
+    return POSITION, address
+
+
+def imm(value: Union[int, str]) -> Parameter:
+    return IMMEDIATE, value
+
+
+def rel(offset: int) -> Parameter:
+    return RELATIVE, offset
+
+
+@dataclass(frozen=True)
+class Workload:
+    name: str
+    program: Tuple[int, ...]
+    inputs: Tuple[int, ...]
+    expected: Tuple[int, ...]  # all outputs of a run on inputs, ending with halt
+
+
+class _Assembler:
+    """ builds a program from instructions whose parameters may name labels """
+
+    def __init__(self):
+        self.cells: List[Union[int, str]] = []
+        self.labels: Dict[str, int] = {}
+
+    def label(self, name: str):
+        self.labels[name] = len(self.cells)
+
+    def op(self, opcode: int, *parameters: Parameter):
+        modes = sum(mode * 10 ** (index + 2) for index, (mode, _) in enumerate(parameters))
+        self.cells.append(opcode + modes)
+        self.cells.extend(value for _, value in parameters)
+
+    def data(self, name: str, *values: int):
+        self.label(name)
+        self.cells.extend(values)
+
+    def assemble(self, size: int) -> Tuple[int, ...]:
+        """ the program with labels resolved, padded with zero cells to size """
+        cells = [self.labels[cell] if isinstance(cell, str) else cell for cell in self.cells]
+        return tuple(cells) + (0,) * (size - len(cells))
+
+
+def _check_positive(**amounts: int):
+    """ loops run their body before the test, so they need at least one round """
+    for name, amount in amounts.items():
+        if amount < 1:
+            raise ValueError(f'Workload needs {name} >= 1, got {amount}')
+
+
+def arithmetic(iterations: int, size: int = 0) -> Workload:
+    """ acc += n + 3 * n for n from iterations down to 1, with a compare in every round """
+    _check_positive(iterations=iterations)
+    asm = _Assembler()
+    asm.label('loop')
+    asm.op(1, pos('acc'), pos('n'), pos('acc'))
+    asm.op(2, pos('n'), imm(3), pos('tmp'))
+    asm.op(1, pos('acc'), pos('tmp'), pos('acc'))
+    asm.op(7, imm(0), pos('n'), pos('tmp'))
+    asm.op(8, pos('tmp'), imm(1), pos('tmp'))
+    asm.op(1, pos('n'), imm(-1), pos('n'))
+    asm.op(5, pos('n'), imm('loop'))
+    asm.op(4, pos('acc'))
+    asm.op(99)
+    asm.data('n', iterations)
+    asm.data('acc', 0)
+    asm.data('tmp', 0)
+    return Workload(f'arithmetic:{iterations}', asm.assemble(size), (), (2 * iterations * (iterations + 1),))
+
+
+def memory(cells: int, passes: int = 1, size: int = 0) -> Workload:
+    """ sums and increments every data cell through the relative base, in every pass """
+    _check_positive(cells=cells, passes=passes)
+    asm = _Assembler()
+    asm.op(9, imm('data'))
+    asm.label('pass')
+    asm.op(1, imm(cells), imm(0), pos('i'))
+    asm.label('loop')
+    asm.op(1, rel(0), pos('sum'), pos('sum'))
+    asm.op(1, rel(0), imm(1), rel(0))
+    asm.op(9, imm(1))
+    asm.op(1, pos('i'), imm(-1), pos('i'))
+    asm.op(5, pos('i'), imm('loop'))
+    asm.op(9, imm(-cells))
+    asm.op(1, pos('passes'), imm(-1), pos('passes'))
+    asm.op(5, pos('passes'), imm('pass'))
+    asm.op(4, pos('sum'))
+    asm.op(99)
+    asm.data('passes', passes)
+    asm.data('i', 0)
+    asm.data('sum', 0)
+    values = [value % 1000 for value in range(cells)]
+    asm.data('data', *values)
+    expected = passes * sum(values) + cells * passes * (passes - 1) // 2
+    return Workload(f'memory:{cells}', asm.assemble(size), (), (expected,))
+
+
+def io(count: int, size: int = 0) -> Workload:
+    """ reads count values and outputs each one doubled """
+    _check_positive(count=count)
+    asm = _Assembler()
+    asm.label('loop')
+    asm.op(3, pos('x'))
+    asm.op(1, pos('x'), pos('x'), pos('x'))
+    asm.op(4, pos('x'))
+    asm.op(1, pos('n'), imm(-1), pos('n'))
+    asm.op(5, pos('n'), imm('loop'))
+    asm.op(99)
+    asm.data('n', count)
+    asm.data('x', 0)
+    inputs = tuple(value % 1000 - 500 for value in range(count))
+    return Workload(f'io:{count}', asm.assemble(size), inputs, tuple(2 * value for value in inputs))
+
+
+def selfmodifying(iterations: int, size: int = 0) -> Workload:
+    """ acc += k with k patched into the instruction and incremented every round, the
+    instruction itself is written back every round so decode caches must drop it """
+    _check_positive(iterations=iterations)
+    asm = _Assembler()
+    asm.label('loop')
+    asm.label('patched')
+    asm.op(1, pos('acc'), imm(0), pos('acc'))
+    asm.op(1, pos('k'), imm(0), pos('operand'))
+    asm.op(1, pos('k'), imm(1), pos('k'))
+    asm.op(1, imm(1001), imm(0), pos('patched'))
+    asm.op(1, pos('n'), imm(-1), pos('n'))
+    asm.op(5, pos('n'), imm('loop'))
+    asm.op(4, pos('acc'))
+    asm.op(99)
+    asm.data('n', iterations)
+    asm.data('k', 1)
+    asm.data('acc', 0)
+    asm.labels['operand'] = asm.labels['patched'] + 2
+    # the first round adds the 0 assembled into the instruction, k is 1 .. iterations - 1 after
+    return Workload(f'selfmodifying:{iterations}', asm.assemble(size), (), (iterations * (iterations - 1) // 2,))
+
+
+GENERATORS: Dict[str, Callable[..., Workload]] = {
+    'arithmetic': arithmetic,
+    'memory': memory,
+    'io': io,
+    'selfmodifying': selfmodifying,
+}
+
+
+def generate(spec: str, size: int = 0) -> Workload:
+    """ workload from a spec like memory:100000 (generator name and its first argument) """
+    kind, _, amount = spec.partition(':')
+    if int(amount) < 1:
+        raise ValueError(f'Workload {spec} needs an amount >= 1')
+    return GENERATORS[kind](int(amount), size=size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Intcode program')
+    parser.add_argument('kind', choices=GENERATORS)
+    parser.add_argument('amount', type=int, help='iterations, data cells or I/O values')
+    parser.add_argument('--size', type=int, default=0, help='pad the program image to this many cells')
+    parser.add_argument('--output', help='program file to write, input/<kind>.txt by default')
+    args = parser.parse_args()
+
+    workload = GENERATORS[args.kind](args.amount, size=args.size)
+    with open(args.output or input_path(f'{args.kind}.txt'), 'w') as program:
+        program.write(','.join(map(str, workload.program)) + '\n')
+    print(f'{workload.name}: {len(workload.program)} cells, {len(workload.inputs)} inputs, '
+          f'expected {list(workload.expected[:5])}{"..." if len(workload.expected) > 5 else ""}')
+
+
+if __name__ == '__main__':
+    main()
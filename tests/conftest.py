@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# the Intcode modules live at the top of the repository, next to the day scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def fresh_translation(monkeypatch):
+    """ translates every program again, a cached module could be from an older translator """
+    import intcode_aot
+    monkeypatch.setattr(intcode_aot, '_modules', {})
+    monkeypatch.setattr(intcode_aot, '_write_module', lambda path, source: False)
@@ -0,0 +1,73 @@
+""" Small Intcode programs made to trip up the compiled tiers and the analysis """
+from typing import List, Sequence, Tuple
+
+from intcode import IntcodeComputer, Status
+
+# block 30 is reached directly with relative base 1000 (input 0), and through the jump table
+# at 17 with relative base 0 (input 1), where its relative write patches the output at 34
+TABLE_WRITE = [
+    3, 50,              # 0: in [50]
+    1005, 50, 10,       # 2: jt [50], 10
+    109, 1000,          # 5: arb 1000
+    1105, 1, 30,        # 7: jt 1, 30
+    1001, 50, 17, 16,   # 10: add [50], 17, [16]
+    105, 1, 0,          # 14: jt 1, [0], the target is table entry 17 + input
+    30, 30,             # 17: jump table
+] + [0] * 11 + [
+    21101, 500, 0, 35,  # 30: add 500, 0, [rb+35]
+    104, 896,           # 34: out 896
+    99,                 # 36: hlt
+] + [0] * 14
+
+# the first input is the address the second input is stored to, the third picks the output
+POINTER_STORE = [
+    3, 3,               # 0: in [3]
+    3, 0,               # 2: in [0], operand patched by the first input
+    3, 100,             # 4: in [100]
+    1005, 100, 12,      # 6: jt [100], 12
+    104, 7,             # 9: out 7
+    99,                 # 11: hlt
+    104, 8,             # 12: out 8
+    99,                 # 14: hlt
+]
+
+# outputs the input counting down to 1 by patching the immediate of an output instruction,
+# then turns its halt into an output of the counter
+SELF_MODIFYING = [
+    3, 100,             # 0: in [100]
+    1001, 100, 0, 7,    # 2: add [100], 0, [7]
+    104, 0,             # 6: out 0, the immediate is patched
+    1001, 100, -1, 100, # 8: add [100], -1, [100]
+    1005, 100, 2,       # 12: jt [100], 2
+    1101, 4, 0, 19,     # 15: add 4, 0, [19]
+    99, 100,            # 19: hlt, patched to out [100]
+    99,                 # 21: hlt
+] + [0] * 78
+
+# bundled programs with inputs, run until they halt or wait for more input
+BUNDLED = [
+    ('day5.txt', (1,)),
+    ('day5.txt', (5,)),
+    ('day7.txt', (3, 0)),
+    ('day7.txt', (9, 0)),
+    ('day9.txt', (1,)),
+    ('day9.txt', (2,)),
+    ('day11.txt', (0,) * 40),
+    ('day13.txt', ()),
+    ('day17.txt', ()),
+    ('day19.txt', (10, 20)),
+    ('day19.txt', (0, 0)),
+    ('day23.txt', (3,) + (-1,) * 20),
+]
+
+
+def drive(computer: IntcodeComputer, inputs: Sequence[int]) -> Tuple[Status, List[int]]:
+    """ runs computer on inputs until it halts or needs more, returns the status and outputs """
+    computer.send(*inputs)
+    status = computer.run()
+    return status, computer.take_outputs()
+
+
+def interpret(program: Sequence[int], inputs: Sequence[int]) -> List[int]:
+    """ outputs of the plain interpreter """
+    return drive(IntcodeComputer(list(program)), inputs)[1]
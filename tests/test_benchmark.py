@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+import benchmark
+from benchmark import WORKLOADS
+from intcode import IntcodeComputer
+from intcode_aot import AotIntcodeComputer
+from intcode_jit import JitIntcodeComputer
+
+ENGINES = {
+    'interpreter': IntcodeComputer,
+    'jit': JitIntcodeComputer,
+    'aot': AotIntcodeComputer,
+}
+
+pytestmark = pytest.mark.usefixtures('fresh_translation')
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', WORKLOADS)
+def test_bundled_workloads_give_the_puzzle_answers(name, engine):
+    workload, expected = WORKLOADS[name]
+    assert workload(ENGINES[engine]) == expected
+
+
+def test_benchmark_results_and_baseline(tmp_path, capsys):
+    result = benchmark.benchmark('day23', IntcodeComputer, repeat=1)
+    assert result['result'] == WORKLOADS['day23'][1]
+    assert result['instructions'] > 0 and result['seconds'] > 0
+
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({'day23': result}))
+    benchmark.compare({'day23': result}, json.loads(baseline.read_text()))
+    assert '1.00x' in capsys.readouterr().out
+
+
+def test_synthetic_workload_lookup():
+    workload, expected, program = benchmark.lookup('io:20', size=1000)
+    assert len(program) == 1000
+    assert workload(IntcodeComputer) == expected
@@ -0,0 +1,256 @@
+import asyncio
+
+import pytest
+
+from intcode import Cluster, IntcodeComputer, Status
+from intcode_workload import generate
+from programs import SELF_MODIFYING, drive
+
+# adds 3 and 4, outputs the sum, then rewrites the add into a multiply and runs it again
+REWRITE_OPCODE = [
+    1101, 3, 4, 21,     # 0: add 3, 4, [21]
+    4, 21,              # 4: out [21]
+    1005, 22, 20,       # 6: jt [22], 20
+    1101, 1, 0, 22,     # 9: add 1, 0, [22]
+    1101, 1102, 0, 0,   # 13: add 1102, 0, [0]
+    1105, 1, 0,         # 17: jt 1, 0
+    99,                 # 20: hlt
+    0, 0,               # 21: sum, 22: second round
+]
+
+
+def test_executed_instructions_are_decoded_again_when_written():
+    computer = IntcodeComputer(REWRITE_OPCODE)
+    assert drive(computer, ()) == (Status.HALTED, [7, 12])
+    assert computer._state._decoded[0].opcode == 2
+
+
+@pytest.mark.parametrize('inputs, expected', [((1,), [1, 0]), ((4,), [4, 3, 2, 1, 0])])
+def test_patched_operands_are_read_again(inputs, expected):
+    assert drive(IntcodeComputer(SELF_MODIFYING), inputs) == (Status.HALTED, expected)
+
+
+def test_decoding_survives_reset():
+    workload = generate('selfmodifying:30')
+    computer = IntcodeComputer(list(workload.program))
+    for _ in range(3):
+        computer.reset()
+        assert drive(computer, ())[1] == list(workload.expected)
+
+
+def test_run_stops_for_input_and_continues():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    assert computer.run() is Status.NEEDS_INPUT
+    assert computer.run() is Status.NEEDS_INPUT
+    computer.send(2)
+    assert computer.run() is Status.HALTED
+    assert computer.take_outputs() == [2, 1, 0]
+    assert computer.take_outputs() == []
+
+
+def test_run_with_output_limit():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    computer.send(5)
+    assert computer.run_until_output(2) is Status.OUTPUT
+    assert computer.take_outputs() == [5, 4]
+    assert computer.run_until_output() is Status.OUTPUT
+    assert computer.take_outputs() == [3]
+    assert computer.run() is Status.HALTED
+    assert computer.take_outputs() == [2, 1, 0]
+
+
+@pytest.mark.parametrize('budget', [1, 2, 7, 100])
+def test_run_with_max_instructions(budget):
+    computer = IntcodeComputer(SELF_MODIFYING)
+    computer.send(6)
+    outputs = []
+    while (status := computer.run(max_instructions=budget)) is not Status.HALTED:
+        assert status in (Status.YIELDED, Status.OUTPUT)
+        outputs += computer.take_outputs()
+    assert outputs + computer.take_outputs() == [6, 5, 4, 3, 2, 1, 0]
+
+
+def test_output_limit_within_max_instructions():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    computer.send(3)
+    assert computer.run(output_limit=1, max_instructions=2) is Status.YIELDED
+    assert computer.run(output_limit=1, max_instructions=100) is Status.OUTPUT
+    assert computer.take_outputs() == [3]
+
+
+def test_snapshot_can_be_restored_repeatedly():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    computer.send(4)
+    computer.run_until_output(2)
+    assert computer.take_outputs() == [4, 3]
+    snapshot = computer.snapshot()
+    for _ in range(2):
+        computer.restore(snapshot)
+        assert computer.run() is Status.HALTED
+        assert computer.take_outputs() == [2, 1, 0]
+
+
+def test_snapshot_is_not_changed_by_later_writes():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    computer.send(1)
+    computer.run_until_output()
+    snapshot = computer.snapshot()
+    computer.run()
+    # the halt at 19 was patched after the snapshot was taken
+    assert computer._state._memory.read(19) == 4
+    assert snapshot._memory.read(19) == 99
+
+
+def test_fork_runs_independently():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    computer.send(3)
+    computer.run_until_output()
+    computer.take_outputs()
+    clone = computer.fork()
+    assert drive(clone, ()) == (Status.HALTED, [2, 1, 0])
+    assert drive(computer, ()) == (Status.HALTED, [2, 1, 0])
+
+
+def test_fork_keeps_queued_inputs_separate():
+    computer = IntcodeComputer([3, 9, 3, 10, 4, 9, 4, 10, 99, 0, 0])
+    computer.send(1)
+    computer.run()
+    clone = computer.fork()
+    clone.send(2)
+    computer.send(3)
+    assert drive(clone, ()) == (Status.HALTED, [1, 2])
+    assert drive(computer, ()) == (Status.HALTED, [1, 3])
+
+
+def test_profile_counts_executed_instructions():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    profile = computer.enable_profiling()
+    assert computer.run() is Status.NEEDS_INPUT
+    computer.send(2)
+    assert computer.run() is Status.HALTED
+    assert computer.take_outputs() == [2, 1, 0]
+
+    report = profile.as_dict(hot_addresses=1)
+    # in, two rounds of add, out, add, jt, then add, out and hlt
+    assert report['instructions'] == 12
+    assert report['opcodes'] == {
+        'AddInstruction': 5, 'OutputInstruction': 3, 'JumpIfTrueInstruction': 2,
+        'InputInstruction': 1, 'HaltInstruction': 1,
+    }
+    assert report['hot_addresses'] == [(2, 2)]
+    assert report['io']['input_stalls'] == 1
+
+
+def test_profiling_keeps_budgets_and_is_not_forked():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    profile = computer.enable_profiling()
+    computer.send(3)
+    assert computer.run(max_instructions=3) is Status.YIELDED
+    assert computer.run(max_instructions=2) is Status.YIELDED
+    assert computer.take_outputs() == [3]
+    clone = computer.fork()
+    assert drive(clone, ())[1] == [2, 1, 0]
+    assert profile.as_dict()['instructions'] == 5
+    computer.disable_profiling()
+    assert drive(computer, ())[1] == [2, 1, 0]
+    assert profile.as_dict()['instructions'] == 5
+
+
+# passes its input on incremented, until it has output 10 or more
+INCREMENT = [
+    3, 20,              # 0: in [20]
+    1001, 20, 1, 20,    # 2: add [20], 1, [20]
+    4, 20,              # 6: out [20]
+    1007, 20, 10, 21,   # 8: lt [20], 10, [21]
+    1005, 21, 0,        # 12: jt [21], 0
+    99,                 # 15: hlt
+] + [0] * 6
+
+
+@pytest.mark.parametrize('time_slice', [1, 3, 1000])
+def test_cluster_runs_a_ring(time_slice):
+    cluster = Cluster([IntcodeComputer(INCREMENT) for _ in range(3)], time_slice)
+    for index in range(3):
+        cluster.connect(index, (index + 1) % 3)
+    cluster.send(0, 0)
+    cluster.run()
+    assert all(cluster.halted(index) for index in range(3))
+    # 10 is output by machine 0, the other two pass on 11 and 12 before they halt
+    assert list(cluster.machines[0]._state.inputs) == [12]
+
+
+def test_cluster_reports_unlinked_outputs_and_skips_blocked_machines():
+    cluster = Cluster([IntcodeComputer(INCREMENT) for _ in range(2)], time_slice=5)
+    cluster.connect(0, 1)
+    received = []
+    cluster.on_output = lambda index, outputs: received.append((index, outputs))
+    assert cluster.step()
+    assert cluster.blocked(0) and cluster.blocked(1)
+    assert not cluster.step()
+
+    cluster.send(0, 3)
+    cluster.run()
+    assert received == [(1, [5])]
+    assert cluster.blocked(0) and cluster.blocked(1)
+    cluster.send(0, 8)
+    cluster.run()
+    assert received == [(1, [5]), (1, [10])]
+    assert cluster.blocked(0) and cluster.halted(1)
+
+
+async def _execute_alongside(computer: IntcodeComputer) -> int:
+    """ executes computer next to a task counting how often it gets to run """
+    ticks = 0
+    done = False
+
+    async def tick():
+        nonlocal ticks
+        while not done:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    ticker = asyncio.ensure_future(tick())
+    assert await computer.execute() is Status.HALTED
+    done = True
+    await ticker
+    return ticks
+
+
+@pytest.mark.parametrize('time_slice', [1, 50, 1000])
+def test_execute_yields_after_the_time_slice(time_slice):
+    workload = generate('selfmodifying:200')
+    outputs = asyncio.Queue()
+    computer = IntcodeComputer(list(workload.program), output_queue=outputs)
+    computer.time_slice = time_slice
+    ticks = asyncio.run(_execute_alongside(computer))
+    assert [outputs.get_nowait() for _ in range(outputs.qsize())] == list(workload.expected)
+    assert computer.stats.yields > 0
+    assert computer.stats.slices > computer.stats.yields
+    assert ticks >= computer.stats.yields
+
+
+def test_execute_without_time_slice():
+    workload = generate('selfmodifying:200')
+    outputs = asyncio.Queue()
+    computer = IntcodeComputer(list(workload.program), output_queue=outputs)
+    computer.time_slice = None
+    asyncio.run(_execute_alongside(computer))
+    assert outputs.qsize() == len(workload.expected)
+    assert computer.stats.yields == 0
+
+
+def test_execute_counts_time_blocked_on_input():
+    async def main():
+        inputs = asyncio.Queue()
+        outputs = asyncio.Queue()
+        computer = IntcodeComputer(SELF_MODIFYING, inputs, outputs)
+        task = asyncio.ensure_future(computer.execute())
+        await asyncio.sleep(0.02)
+        await inputs.put(2)
+        assert await task is Status.HALTED
+        return computer.stats, [outputs.get_nowait() for _ in range(outputs.qsize())]
+
+    stats, outputs = asyncio.run(main())
+    assert outputs == [2, 1, 0]
+    assert stats.blocked_time >= 0.015
+    assert set(stats.as_dict()) == {'slices', 'yields', 'running_time', 'ready_time', 'blocked_time'}
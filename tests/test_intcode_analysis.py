@@ -0,0 +1,35 @@
+import pytest
+
+from intcode_analysis import analyze, listing
+from programs import POINTER_STORE, SELF_MODIFYING, TABLE_WRITE
+from utils import read_intlist
+
+
+def test_jump_table_passes_relative_base_floor():
+    analysis = analyze(TABLE_WRITE)
+    assert 30 in analysis.indirect_targets
+    # reached through the table with relative base 0, the write can hit the output at 34
+    assert analysis.write_ranges[30][0] <= 35
+    assert 34 in analysis.overwritten_instructions
+
+
+def test_pointer_store_is_an_unknown_write():
+    analysis = analyze(POINTER_STORE)
+    assert analysis.unknown_writes == {2}
+    assert 2 not in analysis.write_ranges
+
+
+def test_known_writes_into_code():
+    analysis = analyze(SELF_MODIFYING)
+    assert {6, 19} <= analysis.overwritten_instructions
+    assert not analysis.unknown_writes
+
+
+@pytest.mark.parametrize('name', ['day7', 'day9', 'day13', 'day17', 'day19', 'day23'])
+def test_listing_of_bundled_programs(name):
+    analysis = analyze(read_intlist(f'{name}.txt'))
+    text = listing(analysis)
+    assert 'block_0:' in text
+    assert not set(analysis.write_ranges) & analysis.unknown_writes
+    for address in analysis.overwritten_instructions:
+        assert any(analysis.may_be_written(cell) for cell in analysis.instructions[address].cells)
@@ -0,0 +1,52 @@
+import pytest
+
+from intcode import IntcodeComputer
+from intcode_aot import AotIntcodeComputer, transpile
+from programs import BUNDLED, POINTER_STORE, SELF_MODIFYING, TABLE_WRITE, drive, interpret
+from utils import read_intlist
+
+pytestmark = pytest.mark.usefixtures('fresh_translation')
+
+
+@pytest.mark.parametrize('program, inputs', [
+    (TABLE_WRITE, (0,)),
+    (TABLE_WRITE, (1,)),
+    (SELF_MODIFYING, (1,)),
+    (SELF_MODIFYING, (40,)),
+    (POINTER_STORE, (9, 12345, 1)),
+    (POINTER_STORE, (7, 5, 0)),
+])
+def test_crafted_programs_match_interpreter(program, inputs):
+    computer = AotIntcodeComputer(program)
+    for _ in range(3):
+        computer.reset()
+        assert drive(computer, inputs)[1] == interpret(program, inputs)
+
+
+@pytest.mark.parametrize('name', ['day9.txt', 'day13.txt', 'day23.txt'])
+def test_relative_stores_are_guarded(name):
+    lines = [line.strip() for line in transpile(read_intlist(name)).splitlines()]
+    stores = [index for index, line in enumerate(lines) if line.startswith('m[rb + ')]
+    assert stores
+    for index in stores:
+        target = lines[index][2:lines[index].index(']')]
+        assert lines[index + 1] == f'if {target} in GUARDED:'
+
+
+@pytest.mark.parametrize('name, inputs', BUNDLED)
+def test_bundled_programs_match_interpreter(name, inputs):
+    program = read_intlist(name)
+    assert drive(AotIntcodeComputer(program), inputs) == drive(IntcodeComputer(program), inputs)
+
+
+def test_negative_relative_address_raises():
+    computer = AotIntcodeComputer([109, -1, 204, 0, 99])
+    with pytest.raises(IndexError):
+        computer.run()
+
+
+def test_sparse_memory_stays_paged():
+    computer = AotIntcodeComputer([109, 20000000, 21101, 1, 2, 0, 204, 0, 99])
+    computer.run()
+    assert computer.take_outputs() == [3]
+    assert len(computer._state._memory._dense) < 1 << 20
@@ -0,0 +1,24 @@
+from intcode import IntcodeComputer
+from intcode_ascii import AsciiAdapter
+from programs import interpret
+from utils import read_intlist
+
+
+def test_camera_frame_is_the_printed_text():
+    program = read_intlist('day17.txt')
+    frame = AsciiAdapter(IntcodeComputer(program)).read_frame()
+    assert '\n'.join(frame) == ''.join(map(chr, interpret(program, ()))).strip('\n')
+    assert len({len(line) for line in frame}) == 1
+
+
+def test_robot_dialogue_reports_dust_as_value():
+    program = read_intlist('day17.txt')
+    program[0] = 2
+    lines = ['C,A,C,A,B,A,B,C,B,B', 'L,6,L,12,R,12,L,4', 'L,12,R,12,L,6', 'R,12,L,10,L,10', 'n']
+    robot = AsciiAdapter(IntcodeComputer(program))
+    for line in lines:
+        assert robot.read_until_prompt().endswith('\n')
+        robot.send_line(line)
+    robot.read_until_prompt()
+    assert robot.halted
+    assert robot.values == [1119775]
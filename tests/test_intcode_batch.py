@@ -0,0 +1,35 @@
+import pytest
+
+from intcode import IntcodeComputer
+from intcode_batch import BatchExecutor, run_many
+from intcode_jit import JitIntcodeComputer
+from programs import SELF_MODIFYING, interpret
+from utils import read_intlist
+
+BEAM = [(x, y) for y in range(12, 16) for x in range(8, 14)]
+
+
+def count_down(computer: IntcodeComputer, start: int) -> int:
+    """ job keeping only the sum of the outputs """
+    computer.reset()
+    computer.send(start)
+    computer.run()
+    return sum(computer.take_outputs())
+
+
+def test_run_many_keeps_the_order_of_the_inputs():
+    program = read_intlist('day19.txt')
+    assert run_many('day19.txt', BEAM, workers=2) == [interpret(program, point) for point in BEAM]
+
+
+@pytest.mark.parametrize('computer_class', [IntcodeComputer, JitIntcodeComputer])
+def test_custom_jobs_reuse_the_machine_of_the_worker(computer_class):
+    with BatchExecutor(SELF_MODIFYING, workers=2, computer_class=computer_class) as executor:
+        assert executor.map(range(1, 30), count_down, chunksize=3) == [n * (n + 1) // 2 for n in range(1, 30)]
+        assert executor.map([]) == []
+
+
+def test_jobs_fail_on_missing_input():
+    with BatchExecutor(SELF_MODIFYING, workers=1) as executor:
+        with pytest.raises(ValueError, match='needs more input'):
+            executor.map([[]])
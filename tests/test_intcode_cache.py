@@ -0,0 +1,36 @@
+import pytest
+
+from intcode_cache import QueryCache
+from programs import interpret
+from utils import read_intlist
+
+
+def test_queries_are_memoized():
+    program = read_intlist('day19.txt')
+    cache = QueryCache(program)
+    for x, y in [(3, 4), (10, 12), (3, 4), (10, 12)]:
+        assert cache.query(x, y) == interpret(program, (x, y))
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_unconsumed_inputs_share_the_result():
+    program = read_intlist('day19.txt')
+    cache = QueryCache(program)
+    assert cache.query(5, 6) == cache.query(5, 6, 99)
+    assert cache.hits == 1
+
+
+def test_results_persist_across_caches(tmp_path):
+    program = read_intlist('day19.txt')
+    with QueryCache(program, path=str(tmp_path / 'cache.db')) as cache:
+        cache.query(20, 21)
+    with QueryCache(program, path=str(tmp_path / 'cache.db')) as cache:
+        assert cache.query(20, 21) == interpret(program, (20, 21))
+        assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_programs_waiting_for_input_are_refused():
+    cache = QueryCache(read_intlist('day19.txt'))
+    with pytest.raises(ValueError):
+        cache.query(5)
+    assert cache.misses == 1 and not cache._results
@@ -0,0 +1,91 @@
+import asyncio
+import itertools
+
+import pytest
+
+from intcode import IntcodeComputer, Status
+from intcode_channel import Channel
+from utils import read_intlist
+
+
+def feedback_loop(program, phases, make_channel):
+    """ thrust of the day 7 amplifiers connected in a ring by channels, run with execute() """
+    async def main():
+        channels = [make_channel() for _ in phases]
+        for channel, phase in zip(channels, phases):
+            channel.put_nowait(phase)
+        channels[0].put_nowait(0)
+        amplifiers = [IntcodeComputer(program, channels[index], channels[(index + 1) % len(phases)])
+                      for index in range(len(phases))]
+        await asyncio.gather(*(amplifier.execute() for amplifier in amplifiers))
+        return channels[0].get_nowait()
+    return asyncio.run(main())
+
+
+def lockstep_loop(program, phases):
+    """ the same thrust with the synchronous core """
+    amplifiers = [IntcodeComputer(program) for _ in phases]
+    for amplifier, phase in zip(amplifiers, phases):
+        amplifier.send(phase)
+    signal, status = [0], None
+    while status is not Status.HALTED:
+        for amplifier in amplifiers:
+            amplifier.send(*signal)
+            status = amplifier.run()
+            signal = amplifier.take_outputs()
+    return signal[-1]
+
+
+# the first channel starts with a phase and the first signal
+@pytest.mark.parametrize('maxsize', [0, 2, 3])
+def test_feedback_loop_over_channels(maxsize):
+    program = read_intlist('day7.txt')
+    for phases in itertools.islice(itertools.permutations([5, 6, 7, 8, 9]), 0, 120, 17):
+        assert feedback_loop(program, phases, lambda: Channel(maxsize)) == lockstep_loop(program, phases)
+
+
+def test_feedback_loop_matches_asyncio_queue():
+    program = read_intlist('day7.txt')
+    phases = (9, 7, 8, 5, 6)
+    assert feedback_loop(program, phases, Channel) == feedback_loop(program, phases, asyncio.Queue)
+
+
+def test_bounded_put_many_waits_for_room():
+    async def main():
+        channel = Channel(maxsize=2)
+        received = []
+
+        async def consume():
+            while len(received) < 7:
+                received.extend(await channel.get_many(limit=3))
+                assert len(channel) <= 2
+
+        consumer = asyncio.ensure_future(consume())
+        await channel.put_many(range(7))
+        await consumer
+        return received
+
+    assert asyncio.run(main()) == list(range(7))
+
+
+def test_nowait_limits():
+    channel = Channel(maxsize=1)
+    with pytest.raises(asyncio.QueueEmpty):
+        channel.get_nowait()
+    channel.put_nowait(1)
+    assert channel.full()
+    with pytest.raises(asyncio.QueueFull):
+        channel.put_nowait(2)
+    assert channel.get_nowait() == 1 and channel.empty()
+
+
+def test_get_waits_for_put():
+    async def main():
+        channel = Channel()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        await channel.put(42)
+        return await getter
+
+    assert asyncio.run(main()) == 42
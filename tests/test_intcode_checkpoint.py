@@ -0,0 +1,92 @@
+import pytest
+
+from intcode import CompactMemory, IntcodeComputer, Memory, Status
+from intcode_aot import AotIntcodeComputer
+from intcode_checkpoint import load_checkpoint, save_checkpoint
+from intcode_debug import Debugger
+from intcode_jit import JitIntcodeComputer
+from programs import POINTER_STORE, SELF_MODIFYING, drive, interpret
+from utils import read_intlist
+
+ENGINES = [IntcodeComputer, JitIntcodeComputer, AotIntcodeComputer]
+
+pytestmark = pytest.mark.usefixtures('fresh_translation')
+
+
+@pytest.mark.parametrize('computer_class', ENGINES)
+def test_round_trip_continues_like_the_original(computer_class, tmp_path):
+    program = read_intlist('day9.txt')
+    computer = computer_class(program)
+    computer.send(2)
+    assert computer.run(max_instructions=50_000) is Status.YIELDED
+    save_checkpoint(computer, tmp_path / 'day9.ckpt', {'mode': 2})
+
+    restored = computer_class(program)
+    assert load_checkpoint(restored, tmp_path / 'day9.ckpt') == {'mode': 2}
+    assert type(restored._state) is type(computer._state)
+    assert drive(restored, ()) == (Status.HALTED, interpret(program, (2,)))
+
+
+@pytest.mark.parametrize('computer_class', ENGINES)
+@pytest.mark.parametrize('program, inputs, steps, warm_inputs, expected', [
+    # stopped right after the halt at 19 was patched into an output
+    (SELF_MODIFYING, (2,), 10, (20,), [0]),
+    # waiting for its last input after a pointer store patched the output at 9 to 55
+    (POINTER_STORE, (10, 55), None, (50, 0, 0), [55]),
+])
+def test_restore_after_code_was_modified(computer_class, program, inputs, steps, warm_inputs, expected, tmp_path):
+    computer = IntcodeComputer(program)
+    computer.send(*inputs)
+    computer.run(max_instructions=steps)
+    computer.take_outputs()
+    save_checkpoint(computer, tmp_path / 'patched.ckpt')
+
+    restored = computer_class(program)
+    # warm machines have compiled code for the unmodified program
+    for _ in range(12):
+        restored.reset()
+        drive(restored, warm_inputs)
+    load_checkpoint(restored, tmp_path / 'patched.ckpt')
+    assert drive(restored, (0,)) == (Status.HALTED, expected)
+
+
+def test_pending_inputs_outputs_and_bigints(tmp_path):
+    program = [3, 12, 1101, 2 ** 70, 0, 2000, 4, 2000, 3, 13, 99, 0, 0, 0]
+    computer = IntcodeComputer(program)
+    computer.send(5)
+    computer.run()
+    computer.send(7, 8)
+    save_checkpoint(computer, tmp_path / 'big.ckpt')
+
+    restored = IntcodeComputer(program)
+    load_checkpoint(restored, tmp_path / 'big.ckpt')
+    assert list(restored._state.inputs) == [7, 8]
+    assert restored.take_outputs() == [2 ** 70]
+    assert restored.run() is Status.HALTED
+    assert restored._state._memory.read(13) == 7
+
+
+@pytest.mark.parametrize('memory_class', [Memory, CompactMemory])
+def test_memory_class_of_the_machine(memory_class, tmp_path):
+    program = read_intlist('day9.txt')
+    computer = IntcodeComputer(program, memory_class=memory_class)
+    save_checkpoint(computer, tmp_path / 'start.ckpt')
+    restored = IntcodeComputer(program, memory_class=memory_class)
+    load_checkpoint(restored, tmp_path / 'start.ckpt')
+    assert type(restored._state._memory) is memory_class
+    assert drive(restored, (1,)) == (Status.HALTED, interpret(program, (1,)))
+
+
+def test_debugger_stays_attached(tmp_path):
+    computer = IntcodeComputer(SELF_MODIFYING)
+    computer.send(3)
+    computer.run(max_instructions=1)
+    save_checkpoint(computer, tmp_path / 'start.ckpt')
+
+    restored = IntcodeComputer(SELF_MODIFYING)
+    debugger = Debugger(restored)
+    debugger.break_at(6)
+    load_checkpoint(restored, tmp_path / 'start.ckpt')
+    assert restored.run() is Status.BREAK
+    assert debugger.stop.address == 6
+    assert restored.take_outputs() == []
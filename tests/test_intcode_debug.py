@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from intcode import IntcodeComputer, Status
+from intcode_aot import AotIntcodeComputer
+from intcode_debug import BREAKPOINT, WATCHPOINT, Debugger
+from intcode_jit import JitIntcodeComputer
+from programs import SELF_MODIFYING, interpret
+
+
+def test_breakpoint_stops_before_the_instruction():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    debugger = Debugger(computer)
+    debugger.break_at(6, lambda state: state._memory.read(100) == 2)
+    computer.send(3)
+    assert computer.run() is Status.BREAK
+    assert debugger.stop == (BREAKPOINT, 6, 6, None)
+    assert computer.take_outputs() == [3]
+    assert computer.run() is Status.HALTED
+    assert computer.take_outputs() == [2, 1, 0]
+
+
+def test_watchpoint_stops_after_the_write():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    debugger = Debugger(computer)
+    debugger.watch(19)
+    computer.send(2)
+    assert computer.run() is Status.BREAK
+    assert debugger.stop == (WATCHPOINT, 19, 15, 4)
+    assert computer.run() is Status.HALTED
+    assert computer.take_outputs() == interpret(SELF_MODIFYING, (2,))
+
+
+def test_execute_returns_break():
+    async def main():
+        inputs, outputs = asyncio.Queue(), asyncio.Queue()
+        computer = IntcodeComputer(SELF_MODIFYING, inputs, outputs)
+        debugger = Debugger(computer)
+        debugger.break_at(15)
+        await inputs.put(2)
+        first = await computer.execute()
+        stopped = [outputs.get_nowait() for _ in range(outputs.qsize())]
+        second = await computer.execute()
+        return first, stopped, second, [outputs.get_nowait() for _ in range(outputs.qsize())]
+
+    assert asyncio.run(main()) == (Status.BREAK, [2, 1], Status.HALTED, [0])
+
+
+def test_detach_runs_through():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    debugger = Debugger(computer)
+    debugger.break_at(6)
+    debugger.detach()
+    computer.send(2)
+    assert computer.run() is Status.HALTED
+    assert computer.take_outputs() == [2, 1, 0]
+
+
+@pytest.mark.parametrize('computer_class', [JitIntcodeComputer, AotIntcodeComputer])
+def test_compiled_machines_are_refused(computer_class):
+    with pytest.raises(ValueError):
+        Debugger(computer_class(SELF_MODIFYING))
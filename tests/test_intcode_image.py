@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+import intcode_image
+from intcode import IntcodeComputer, Status
+from intcode_image import clear_images, image_cells, load_image
+from programs import SELF_MODIFYING, drive
+
+
+@pytest.fixture(autouse=True)
+def no_images():
+    clear_images()
+    yield
+    clear_images()
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'program.txt'
+    path.write_text(','.join(map(str, SELF_MODIFYING)) + '\n')
+    return str(path)
+
+
+def _cache_path(source: str) -> str:
+    directory, name = os.path.split(source)
+    return os.path.join(directory, '__pycache__', name + '.image')
+
+
+def test_image_is_parsed_once_and_shared(source):
+    image = load_image(source)
+    assert image == tuple(SELF_MODIFYING)
+    assert load_image(source) is image
+    assert list(image_cells(image)) == SELF_MODIFYING
+    assert image_cells(tuple(SELF_MODIFYING)) is None
+    assert drive(IntcodeComputer(source), (2,)) == (Status.HALTED, [2, 1, 0])
+
+
+def test_cold_start_reads_the_cache(source, monkeypatch):
+    load_image(source)
+    assert os.path.exists(_cache_path(source))
+    clear_images()
+    monkeypatch.setattr(intcode_image, '_write_cache', lambda *arguments: pytest.fail('parsed again'))
+    assert load_image(source) == tuple(SELF_MODIFYING)
+
+
+def test_changed_source_is_parsed_again(source):
+    image = load_image(source)
+    with open(source, 'w') as program:
+        program.write('104,5,99\n')
+    assert load_image(source) == (104, 5, 99)
+    assert image_cells(image) is None
+    clear_images()
+    assert load_image(source) == (104, 5, 99)
+
+
+def test_corrupt_cache_is_ignored(source):
+    load_image(source)
+    with open(_cache_path(source), 'r+b') as cache:
+        cache.truncate(intcode_image.HEADER.size + 8)
+    clear_images()
+    assert load_image(source) == tuple(SELF_MODIFYING)
+
+
+def test_bigint_programs_are_not_cached(source):
+    with open(source, 'w') as program:
+        program.write(f'104,{2 ** 70},99\n')
+    image = load_image(source)
+    assert image == (104, 2 ** 70, 99)
+    assert image_cells(image) is None
+    assert not os.path.exists(_cache_path(source))
@@ -0,0 +1,55 @@
+import pytest
+
+from intcode import IntcodeComputer, Status
+from intcode_jit import JitIntcodeComputer
+from programs import BUNDLED, POINTER_STORE, SELF_MODIFYING, TABLE_WRITE, drive, interpret
+from utils import read_intlist
+
+
+@pytest.mark.parametrize('program, inputs', [
+    (TABLE_WRITE, (0,)),
+    (TABLE_WRITE, (1,)),
+    (SELF_MODIFYING, (1,)),
+    (SELF_MODIFYING, (40,)),
+    (POINTER_STORE, (9, 12345, 1)),
+    (POINTER_STORE, (7, 5, 0)),
+])
+def test_crafted_programs_match_interpreter(program, inputs):
+    computer = JitIntcodeComputer(program)
+    # blocks get hot and are carried into the initial state over the resets
+    for _ in range(12):
+        computer.reset()
+        assert drive(computer, inputs)[1] == interpret(program, inputs)
+
+
+def test_self_modifying_code_after_reset_with_other_input():
+    computer = JitIntcodeComputer(SELF_MODIFYING)
+    for count in (30, 1, 12, 3):
+        computer.reset()
+        assert drive(computer, (count,))[1] == interpret(SELF_MODIFYING, (count,))
+
+
+@pytest.mark.parametrize('name, inputs', BUNDLED)
+def test_bundled_programs_match_interpreter(name, inputs):
+    program = read_intlist(name)
+    computer = JitIntcodeComputer(program)
+    assert drive(computer, inputs) == drive(IntcodeComputer(program), inputs)
+
+
+def test_instruction_budget_yields():
+    program = read_intlist('day9.txt')
+    computer = JitIntcodeComputer(program)
+    computer.send(2)
+    slices = 0
+    while computer.run(max_instructions=10_000).name == 'YIELDED':
+        slices += 1
+    assert slices > 10
+    assert computer.take_outputs() == interpret(program, (2,))
+
+
+@pytest.mark.parametrize('computer_class', [IntcodeComputer, JitIntcodeComputer])
+def test_untaken_jump_reads_its_target(computer_class):
+    # jf 1, [rb+20] with relative base -1 is never taken, its target address is still read
+    program = [109, -1, 2106, 1, 20, 1105, 1, 0, 99]
+    with pytest.raises(IndexError, match='Negative memory address -1'):
+        computer_class(program).run(max_instructions=1000)
@@ -0,0 +1,36 @@
+import pytest
+
+from intcode import IntcodeComputer
+from programs import interpret
+from utils import read_intlist
+
+pytest.importorskip('numpy')
+from intcode_lockstep import LockstepComputer  # noqa: E402
+
+
+def test_batch_matches_interpreter():
+    program = read_intlist('day19.txt')
+    probes = [(x, y) for x in range(0, 40, 3) for y in range(0, 40, 7)]
+    assert LockstepComputer(program).run(probes) == [interpret(program, probe) for probe in probes]
+
+
+def test_diverging_instances():
+    program = read_intlist('day5.txt')
+    assert LockstepComputer(program).run([(1,), (5,)]) == [interpret(program, (1,)), interpret(program, (5,))]
+
+
+def test_patches_and_final_memory():
+    program = read_intlist('day2.txt')
+    nouns, verbs = [12, 0, 31], [2, 0, 7]
+    state = LockstepComputer(program).execute([()] * 3, patches={1: nouns, 2: verbs})
+    for lane, (noun, verb) in enumerate(zip(nouns, verbs)):
+        computer = IntcodeComputer(program[:1] + [noun, verb] + program[3:])
+        computer.run()
+        assert state.memory[lane, 0] == computer._state._memory.read(0)
+    assert state.results() == [[], [], []]
+
+
+def test_empty_batch():
+    computer = LockstepComputer(read_intlist('day19.txt'))
+    assert computer.run([]) == []
+    assert computer.execute([], patches={0: []}).results() == []
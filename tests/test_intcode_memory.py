@@ -0,0 +1,75 @@
+from array import array
+
+import pytest
+
+from intcode import PAGE_BITS, PAGE_SIZE, CompactMemory, IntcodeComputer, Memory
+from programs import drive
+from utils import read_intlist
+
+
+def test_pages_are_allocated_on_write_only():
+    memory = Memory([1, 2, 3])
+    assert memory.read(10 ** 9) == 0
+    assert memory.allocated() == 3
+    memory.write(10 ** 9, 7)
+    assert memory.read(10 ** 9) == 7
+    assert memory.allocated() == 3 + PAGE_SIZE
+
+
+def test_negative_addresses_raise():
+    memory = Memory([1, 2, 3])
+    with pytest.raises(IndexError):
+        memory.read(-1)
+    with pytest.raises(IndexError):
+        memory.write(-1, 0)
+
+
+def test_copies_are_independent():
+    memory = Memory([1, 2, 3])
+    memory.write(5000, 4)
+    clone = memory.copy()
+    clone.write(0, 10)
+    clone.write(5000, 40)
+    memory.write(1, 20)
+    assert [memory.read(address) for address in (0, 1, 5000)] == [1, 20, 4]
+    assert [clone.read(address) for address in (0, 1, 5000)] == [10, 2, 40]
+
+
+def test_tuple_images_are_shared_until_written():
+    image = (1, 2, 3)
+    memory = Memory(image)
+    assert memory._dense is image
+    memory.write(0, 5)
+    assert image == (1, 2, 3) and memory.read(0) == 5
+
+
+def test_far_relative_writes():
+    # arb 10**8, add 1 + 2 to [rb], out [rb]
+    computer = IntcodeComputer([109, 10 ** 8, 21101, 1, 2, 0, 204, 0, 99])
+    computer.run()
+    assert computer.take_outputs() == [3]
+    assert computer._state._memory.allocated() < 10 + 2 * PAGE_SIZE
+
+
+def test_compact_memory_promotes_bigints():
+    memory = CompactMemory([1, 2, 3])
+    memory.write(1, 2 ** 70)
+    memory.write(5000, -2 ** 70)
+    memory.write(6000, 5)
+    assert [memory.read(address) for address in (0, 1, 5000, 6000)] == [1, 2 ** 70, -2 ** 70, 5]
+    assert isinstance(memory._pages[6000 >> PAGE_BITS], array)
+
+
+def test_compact_memory_copies_and_buffers():
+    memory = CompactMemory.over_buffers(memoryview(array('q', [1, 2, 3])), {})
+    clone = memory.copy()
+    clone.write(0, 9)
+    assert memory.read(0) == 1 and clone.read(0) == 9
+    assert isinstance(memory._dense, memoryview)
+
+
+@pytest.mark.parametrize('name, inputs', [('day9.txt', (1,)), ('day9.txt', (2,)), ('day5.txt', (5,))])
+def test_compact_memory_machines_match_plain_ones(name, inputs):
+    program = read_intlist(name)
+    assert drive(IntcodeComputer(program, memory_class=CompactMemory), inputs) == \
+        drive(IntcodeComputer(program), inputs)
@@ -0,0 +1,93 @@
+import pytest
+
+from intcode import IntcodeComputer, Status
+from intcode_aot import AotIntcodeComputer
+from intcode_jit import JitIntcodeComputer
+from intcode_replay import INPUT, OUTPUT, Event, Recording, ReplayMismatch, record, replay, stop_recording
+from programs import SELF_MODIFYING, interpret
+from utils import read_intlist
+
+ENGINES = [IntcodeComputer, JitIntcodeComputer, AotIntcodeComputer]
+
+pytestmark = pytest.mark.usefixtures('fresh_translation')
+
+# squares its input until it is interrupted by an input of 0
+SQUARES = [
+    3, 20,              # 0: in [20]
+    1006, 20, 16,       # 2: jf [20], 16
+    2, 20, 20, 20,      # 5: mul [20], [20], [20]
+    4, 20,              # 9: out [20]
+    1105, 1, 0,         # 11: jt 1, 0
+    0, 0,               # 14: padding
+    99,                 # 16: hlt
+] + [0] * 4
+
+
+def test_recording_logs_inputs_and_outputs():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    recording = record(computer)
+    assert computer.run() is Status.NEEDS_INPUT
+    computer.send(2)
+    assert computer.run() is Status.HALTED
+    assert computer.take_outputs() == [2, 1, 0]
+    assert recording.events == [
+        Event(INPUT, 0, 2), Event(OUTPUT, 2, 2), Event(OUTPUT, 6, 1), Event(OUTPUT, 10, 0),
+    ]
+    assert recording.instructions == 12
+
+    stop_recording(computer)
+    assert 'run' not in computer.__dict__
+
+
+@pytest.mark.parametrize('computer_class', ENGINES)
+def test_save_load_and_replay(computer_class, tmp_path):
+    computer = IntcodeComputer(SQUARES)
+    recording = record(computer)
+    for value in (3, 2 ** 40, 0):
+        computer.send(value)
+        computer.run(max_instructions=3)
+        computer.run()
+    # 2 ** 80 does not fit the int64 of an event
+    assert recording.outputs() == [9, 2 ** 80]
+    recording.save(tmp_path / 'squares.log')
+
+    loaded = Recording.load(tmp_path / 'squares.log')
+    assert loaded.program == recording.program
+    assert loaded.instructions == recording.instructions
+    assert loaded.events == recording.events
+    assert replay(loaded, computer_class(SQUARES)) is Status.HALTED
+
+
+def test_replay_of_a_bundled_program():
+    program = read_intlist('day9.txt')
+    computer = IntcodeComputer(program)
+    recording = record(computer)
+    computer.send(1)
+    computer.run()
+    assert recording.outputs() == interpret(program, (1,))
+    assert replay(recording, JitIntcodeComputer(program)) is Status.HALTED
+
+
+def test_replay_reports_where_it_diverges():
+    computer = IntcodeComputer(SELF_MODIFYING)
+    recording = record(computer)
+    computer.send(2)
+    computer.run()
+    recorded = recording.events[2]
+    recording.events[2] = recorded._replace(value=5)
+    with pytest.raises(ReplayMismatch, match='Output 1 is 1, recorded 5 after 6 instructions'):
+        replay(recording, IntcodeComputer(SELF_MODIFYING))
+
+    recording.events[2] = recorded
+    del recording.events[3]
+    with pytest.raises(ReplayMismatch, match='produced 3 outputs, recorded 2'):
+        replay(recording, IntcodeComputer(SELF_MODIFYING))
+
+    with pytest.raises(ValueError, match='different program'):
+        replay(recording, IntcodeComputer(SQUARES))
+
+
+def test_load_rejects_other_files(tmp_path):
+    (tmp_path / 'other.log').write_bytes(b'\0' * 100)
+    with pytest.raises(ValueError, match='not an Intcode recording'):
+        Recording.load(tmp_path / 'other.log')
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+from intcode_server import QueryClient, QueryServer
+from programs import interpret
+from utils import read_intlist
+
+# outputs the sum of its two inputs, loops forever when the first one is 0
+ADD_OR_LOOP = [3, 20, 3, 21, 1006, 20, 15, 1, 20, 21, 22, 4, 22, 99, 0, 1105, 1, 15] + [0] * 5
+
+
+def serve(program, test, **options):
+    """ runs the coroutine test(server) against a server listening on a free port """
+    async def main():
+        server = QueryServer(program, pool_size=2, **options)
+        await server.start()
+        try:
+            return await test(server)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+async def exchange(server, *requests):
+    """ sends raw request lines on one connection, returns the responses """
+    reader, writer = await asyncio.open_connection(*server.address)
+    for request in requests:
+        writer.write(json.dumps(request).encode() + b'\n')
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in requests]
+    writer.close()
+    return responses
+
+
+def test_queries_match_interpreter():
+    program = read_intlist('day19.txt')
+    probes = [(x, y) for x in range(0, 30, 7) for y in range(0, 30, 5)]
+
+    async def test(server):
+        async with QueryClient(host=server.address[0], port=server.address[1]) as client:
+            single = await client.query(*probes[0])
+            return single, await client.query_batch(probes)
+
+    single, batch = serve(program, test)
+    assert single == interpret(program, probes[0])
+    assert batch == [interpret(program, probe) for probe in probes]
+
+
+@pytest.mark.parametrize('inputs', [[['x', 1]], [[None, None]], [[1.5, 2]], [[True, 1]], [1, 2], 'ab', None])
+def test_malformed_inputs_fail_the_request_only(inputs):
+    responses = serve(ADD_OR_LOOP, lambda server: exchange(
+        server, {'id': 1, 'inputs': inputs}, {'id': 2, 'inputs': [[2, 3]]}))
+    assert responses[0]['id'] == 1 and 'error' in responses[0]
+    assert responses[1] == {'id': 2, 'outputs': [[5]]}
+
+
+def test_program_errors_fail_the_request_only():
+    responses = serve([109, -1, 204, 0, 99], lambda server: exchange(
+        server, {'id': 1, 'inputs': [[]]}, {'id': 2, 'inputs': []}))
+    assert responses[0]['error'].startswith('IndexError')
+    assert responses[1] == {'id': 2, 'outputs': []}
+
+
+def test_endless_runs_fail_and_others_are_answered():
+    async def test(server):
+        looping = asyncio.ensure_future(exchange(server, {'id': 1, 'inputs': [[0, 1]]}))
+        answered = await exchange(server, {'id': 2, 'inputs': [[2, 3]], 'ignored': True})
+        return answered, await looping
+
+    answered, looping = serve(ADD_OR_LOOP, test, max_instructions=200_000)
+    assert answered == [{'id': 2, 'outputs': [[5]]}]
+    assert 'did not finish' in looping[0]['error']
+
+
+def test_missing_input_fails_the_request():
+    responses = serve(ADD_OR_LOOP, lambda server: exchange(server, {'id': 7, 'inputs': [[1]]}))
+    assert 'needs more input' in responses[0]['error']
+
+
+def test_cancelled_query_keeps_the_connection():
+    async def test(server):
+        async with QueryClient(host=server.address[0], port=server.address[1], connections=1) as client:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.query(0, 1), 0.01)
+            # answered on the same connection, after the response to the cancelled query
+            return await client.query(2, 3)
+
+    assert serve(ADD_OR_LOOP, test, max_instructions=500_000) == [5]
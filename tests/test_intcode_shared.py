@@ -0,0 +1,62 @@
+import pickle
+
+import pytest
+
+from intcode import PAGE_SIZE, IntcodeComputer, Status
+from intcode_batch import BatchExecutor
+from intcode_jit import JitIntcodeComputer
+from intcode_shared import OverlayMemory, SharedImage
+from programs import SELF_MODIFYING, drive, interpret
+from utils import read_intlist
+
+
+def test_image_holds_the_program_padded_to_pages():
+    program = read_intlist('day9.txt') + [0] * (2 * PAGE_SIZE)
+    with SharedImage(program) as image:
+        assert image.length == len(program)
+        assert len(image.cells) % PAGE_SIZE == 0
+        assert list(image.cells[:len(program)]) == program
+
+
+def test_pickled_image_maps_the_same_segment():
+    with SharedImage(SELF_MODIFYING) as image:
+        attached = pickle.loads(pickle.dumps(image))
+        assert attached.name == image.name
+        assert list(attached.cells[:attached.length]) == SELF_MODIFYING
+        image.cells[0] = 4
+        assert attached.cells[0] == 4
+        attached.close()
+
+
+def test_bigint_programs_cannot_be_shared():
+    with pytest.raises(ValueError, match='int64'):
+        SharedImage([2 ** 64, 99])
+
+
+@pytest.mark.parametrize('computer_class', [IntcodeComputer, JitIntcodeComputer])
+def test_machines_write_to_private_pages(computer_class):
+    program = SELF_MODIFYING + [0] * PAGE_SIZE
+    with SharedImage(program) as image:
+        machines = [computer_class(image.cells, memory_class=OverlayMemory) for _ in range(2)]
+        assert drive(machines[0], (3,)) == (Status.HALTED, [3, 2, 1, 0])
+        # the first machine patched its code, the image and the second machine still see the original
+        assert image.cells[19] == 99
+        assert drive(machines[1], (2,)) == (Status.HALTED, [2, 1, 0])
+        machines[0].reset()
+        assert drive(machines[0], (1,)) == (Status.HALTED, [1, 0])
+        del machines
+
+
+def test_bundled_program_on_an_overlay():
+    program = read_intlist('day9.txt')
+    with SharedImage(program) as image:
+        computer = IntcodeComputer(image.cells, memory_class=OverlayMemory)
+        assert drive(computer, (1,)) == (Status.HALTED, interpret(program, (1,)))
+        del computer
+
+
+def test_batch_executor_on_a_shared_image():
+    program = read_intlist('day19.txt')
+    points = [(x, y) for y in range(20, 23) for x in range(10, 20)]
+    with BatchExecutor(program, workers=2, shared=True) as executor:
+        assert executor.map(points) == [interpret(program, point) for point in points]
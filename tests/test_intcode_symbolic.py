@@ -0,0 +1,86 @@
+import pytest
+
+from intcode import IntcodeComputer
+from intcode_symbolic import SymbolicFailure, execute, find_inputs, search
+from utils import read_intlist
+
+DAY2_DOMAINS = {'noun': range(99), 'verb': range(99)}
+
+
+def run_day2(program, noun, verb):
+    computer = IntcodeComputer(program[:1] + [noun, verb] + program[3:])
+    computer.run()
+    return computer._state._memory.read(0)
+
+
+@pytest.mark.parametrize('target', [19690720, 3101844])
+def test_day2_solution_runs_to_target(target):
+    program = read_intlist('day2.txt')
+    inputs = find_inputs(program, {1: 'noun', 2: 'verb'}, target, DAY2_DOMAINS)
+    assert run_day2(program, inputs['noun'], inputs['verb']) == target
+
+
+def test_day2_without_solution():
+    program = read_intlist('day2.txt')
+    assert find_inputs(program, {1: 'noun', 2: 'verb'}, 1, DAY2_DOMAINS) is None
+
+
+def test_symbolic_output_matches_interpreter():
+    program = read_intlist('day2.txt')
+    memory = execute(program, {1: 'noun', 2: 'verb'})
+    for noun, verb in [(0, 0), (12, 2), (98, 98)]:
+        assert memory[0].evaluate({'noun': noun, 'verb': verb}) == run_day2(program, noun, verb)
+
+
+@pytest.mark.parametrize('program', [
+    [1, -1, 0, 0, 99],          # read from a negative address
+    [1101, 1, 1, -2, 99],       # store to a negative address
+    [1105, 1, -3, 99],          # jump to a negative address
+])
+def test_negative_addresses_fail(program):
+    with pytest.raises(SymbolicFailure):
+        execute(program, {})
+    with pytest.raises(IndexError):
+        IntcodeComputer(program).run()
+
+
+def test_unsupported_instructions_fall_back_to_search():
+    # arb is not followed symbolically, the sum of cells 10 and 11 is stored in cell 0
+    program = [9, 12, 22201, 10, 11, 0, 99, 0, 0, 0, 0, 0, 0]
+    domains = {'a': range(5), 'b': range(5)}
+    with pytest.raises(SymbolicFailure):
+        execute(program, {10: 'a', 11: 'b'})
+    assert find_inputs(program, {10: 'a', 11: 'b'}, 7, domains) == search(program, {10: 'a', 11: 'b'}, 7, domains)
+    assert find_inputs(program, {10: 'a', 11: 'b'}, 7, domains) == {'a': 3, 'b': 4}
+
+
+def test_running_past_the_program_fails_symbolically():
+    # jumps to 50, where memory reads 0, no valid opcode
+    with pytest.raises(SymbolicFailure):
+        execute([1105, 1, 50, 99], {})
+    assert find_inputs([1105, 1, 50, 99], {}, 0, {}) is None
+
+
+def test_search_skips_combinations_the_program_fails_on():
+    # a == 0 runs past the end, any other a jumps to 99, both hit opcode 0
+    assert find_inputs([1, 0, 0, 0, 1105, 0, 99], {5: 'a'}, 2, {'a': range(10)}) is None
+    # cell 0 = a + a, a jump on it to b, which fails for b == -1 before b == 7 is tried
+    program = [1, 9, 9, 0, 1005, 0, 0, 99, 0, 0]
+    assert find_inputs(program, {9: 'a', 6: 'b'}, 14, {'a': range(10), 'b': [-1, 7]}) == {'a': 7, 'b': 7}
+
+
+def test_search_skips_combinations_that_do_not_halt():
+    # a == 0 runs into opcode 0 at 7, any other a jumps back to 0 forever
+    program = [1005, 7, 0, 1101, 1, 0, 8, 99, 0]
+    assert search(program, {7: 'a'}, 1, {'a': range(3)}, max_instructions=10_000) is None
+    assert find_inputs(program, {7: 'a'}, 1, {'a': range(3)}) is None
+    # an input instruction waits: cell 0 is only compared when the run halts
+    assert search([3, 0, 99], {}, 3, {}) is None
+
+
+def test_immediate_writes_fail():
+    # the interpreter rejects the immediate mode target, so no run can reach the target
+    program = [11101, 0, 0, 0, 99]
+    with pytest.raises(SymbolicFailure):
+        execute(program, {1: 'a', 2: 'b'})
+    assert find_inputs(program, {1: 'a', 2: 'b'}, 5, {'a': range(10), 'b': range(10)}) is None
@@ -0,0 +1,52 @@
+import pytest
+
+from intcode import CompactMemory, IntcodeComputer
+from intcode_aot import AotIntcodeComputer
+from intcode_jit import JitIntcodeComputer
+from intcode_workload import generate
+from programs import drive
+
+
+ENGINES = {
+    'interpreter': IntcodeComputer,
+    'compact': lambda program: IntcodeComputer(program, memory_class=CompactMemory),
+    'jit': JitIntcodeComputer,
+    'aot': AotIntcodeComputer,
+}
+
+SPECS = ['arithmetic:500', 'memory:300', 'io:100', 'selfmodifying:200']
+
+pytestmark = pytest.mark.usefixtures('fresh_translation')
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('spec', SPECS)
+@pytest.mark.parametrize('size', [0, 5000])
+def test_engines_produce_expected_outputs(engine, spec, size):
+    workload = generate(spec, size)
+    computer = ENGINES[engine](list(workload.program))
+    # again after a reset, with whatever the first run compiled
+    for _ in range(2):
+        computer.reset()
+        assert drive(computer, workload.inputs)[1] == list(workload.expected)
+
+
+@pytest.mark.parametrize('spec', SPECS)
+def test_lockstep_produces_expected_outputs(spec):
+    pytest.importorskip('numpy')
+    from intcode_lockstep import LockstepComputer
+    workload = generate(spec)
+    assert LockstepComputer(list(workload.program)).run([workload.inputs] * 3) == [list(workload.expected)] * 3
+
+
+def test_size_pads_with_data():
+    small, large = generate('memory:50'), generate('memory:50', size=10_000)
+    assert len(large.program) == 10_000
+    assert large.program[:len(small.program)] == small.program
+    assert large.expected == small.expected
+
+
+@pytest.mark.parametrize('spec', ['arithmetic:0', 'memory:0', 'io:0', 'selfmodifying:-1'])
+def test_workloads_need_one_round(spec):
+    with pytest.raises(ValueError):
+        generate(spec)